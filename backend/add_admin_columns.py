@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Add assignment columns to disputes and verifications tables created before they existed
+"""
+
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.database import engine
+from sqlalchemy import text
+
+def add_admin_columns():
+    """Add disputes.assigned_manager and verifications.employee_id if missing"""
+    print("🔧 Adding assignment columns to disputes and verifications...")
+    
+    with engine.begin() as conn:
+        try:
+            conn.execute(text("ALTER TABLE disputes ADD COLUMN IF NOT EXISTS assigned_manager INTEGER NULL REFERENCES users(id);"))
+            conn.execute(text("ALTER TABLE verifications ADD COLUMN IF NOT EXISTS employee_id INTEGER NULL REFERENCES users(id);"))
+            print('✅ Assignment columns are present')
+        except Exception as e:
+            print(f'❌ Error: {e}')
+            raise
+
+if __name__ == "__main__":
+    add_admin_columns()
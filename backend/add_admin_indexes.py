@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Add indexes backing the admin list and analytics queries
+"""
+
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.database import engine
+from sqlalchemy import text
+
+INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_role_created_at ON users (role, created_at DESC);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_verifications_status_created_at ON verifications (status, created_at);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bookings_status_start_time ON bookings (status, start_time);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_disputes_status_created_at ON disputes (status, created_at DESC);",
+    # Covers the revenue rollup so it can be answered from the index alone
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_token_transactions_type_status_created_at "
+    "ON token_transactions (type, status, created_at) INCLUDE (amount);",
+]
+
+def add_admin_indexes():
+    """Create admin query indexes without locking the tables against writes"""
+    print("🔧 Adding admin query indexes...")
+    
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        try:
+            for statement in INDEXES:
+                conn.execute(text(statement))
+            print('✅ Added admin query indexes successfully')
+        except Exception as e:
+            print(f'❌ Error: {e}')
+            raise
+
+if __name__ == "__main__":
+    add_admin_indexes()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Add indexes backing the seeker/provider booking lists
+"""
+
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.database import engine
+from sqlalchemy import text
+
+INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bookings_seeker_created ON bookings (seeker_id, created_at DESC);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_bookings_provider_created ON bookings (provider_id, created_at DESC);",
+]
+
+def add_booking_indexes():
+    """Create booking list indexes without locking the table against writes"""
+    print("🔧 Adding booking list indexes...")
+    
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        try:
+            for statement in INDEXES:
+                conn.execute(text(statement))
+            print('✅ Added booking list indexes successfully')
+        except Exception as e:
+            print(f'❌ Error: {e}')
+            raise
+
+if __name__ == "__main__":
+    add_booking_indexes()
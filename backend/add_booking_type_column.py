@@ -18,16 +18,16 @@ def add_booking_type_column():
     
     with engine.begin() as conn:
         try:
-            # Check if column exists
-            result = conn.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name='bookings' AND column_name='booking_type';"))
-            if not result.fetchone():
-                # Add the new column
-                conn.execute(text("ALTER TABLE bookings ADD COLUMN booking_type VARCHAR(50) DEFAULT 'outcall';"))
-                # Update existing records to have a default value
-                conn.execute(text("UPDATE bookings SET booking_type = 'outcall' WHERE booking_type IS NULL;"))
-                print('✅ Added booking_type column successfully')
-            else:
-                print('✅ booking_type column already exists')
+            # Fail fast instead of queueing behind long-running transactions on bookings
+            conn.execute(text("SET LOCAL lock_timeout = '5s';"))
+            # A constant default is applied to existing rows without rewriting the table (PostgreSQL 11+)
+            # SQLAlchemy stores enum member names, so the default must be 'OUTCALL' rather than 'outcall'
+            conn.execute(text("ALTER TABLE bookings ADD COLUMN IF NOT EXISTS booking_type VARCHAR(50) NOT NULL DEFAULT 'OUTCALL';"))
+            conn.execute(text("ALTER TABLE bookings ALTER COLUMN booking_type SET DEFAULT 'OUTCALL';"))
+            print('✅ booking_type column is present')
+            # Rows written with the old lowercase default are fixed by fix_booking_type_enum.py,
+            # which scans the table and so must not run under this ALTER's lock
+            print('ℹ️  Run fix_booking_type_enum.py to convert any lowercase booking_type values')
         except Exception as e:
             print(f'❌ Error: {e}')
             raise
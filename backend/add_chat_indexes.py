@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Add indexes backing chat history and the flagged message queue
+"""
+
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.database import engine
+from sqlalchemy import text
+
+INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chat_msg_booking_created ON chat_messages (booking_id, created_at);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chat_msg_flagged ON chat_messages (created_at DESC, id DESC) WHERE is_flagged = true;",
+]
+
+def add_chat_indexes():
+    """Create chat message indexes without locking the table against writes"""
+    print("🔧 Adding chat message indexes...")
+    
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        try:
+            for statement in INDEXES:
+                conn.execute(text(statement))
+            print('✅ Added chat message indexes successfully')
+        except Exception as e:
+            print(f'❌ Error: {e}')
+            raise
+
+if __name__ == "__main__":
+    add_chat_indexes()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Add a full-text search column and index to help_articles
+"""
+
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.database import engine
+from app.models.support import HELP_ARTICLE_SEARCH_TSV_SQL
+from sqlalchemy import text
+
+CREATE_INDEX_SQL = "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_help_articles_search_tsv ON help_articles USING GIN (search_tsv);"
+
+def add_help_article_search():
+    """Add the generated search_tsv column, then index it without blocking writes"""
+    print("🔧 Adding help article full-text search...")
+    
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        try:
+            conn.execute(text(HELP_ARTICLE_SEARCH_TSV_SQL))
+            conn.execute(text(CREATE_INDEX_SQL))
+            print('✅ Added help article full-text search successfully')
+        except Exception as e:
+            print(f'❌ Error: {e}')
+            raise
+
+if __name__ == "__main__":
+    add_help_article_search()
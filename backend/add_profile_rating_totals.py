@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Add rating totals to profiles
+
+Adds profiles.total_ratings and profiles.rating_sum and backfills them from
+ratings; the application keeps them current from then on (see
+app/models/rating.py). Replaces the provider_rating_summary materialized view
+and removes the ratings trigger earlier versions of this script installed,
+which would now double count.
+"""
+
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.database import engine
+from sqlalchemy import text
+
+ADD_COLUMNS_SQL = """
+ALTER TABLE profiles
+    ADD COLUMN IF NOT EXISTS total_ratings INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS rating_sum INTEGER NOT NULL DEFAULT 0;
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS ratings_profile_totals ON ratings;
+DROP FUNCTION IF EXISTS update_profile_rating_totals();
+"""
+
+BACKFILL_SQL = """
+UPDATE profiles p
+SET total_ratings = r.total_ratings, rating_sum = r.rating_sum
+FROM (
+    SELECT rated_user, COUNT(*) AS total_ratings, SUM(rating) AS rating_sum
+    FROM ratings
+    GROUP BY rated_user
+) r
+WHERE p.user_id = r.rated_user;
+"""
+
+CREATE_INDEX_SQL = "CREATE INDEX IF NOT EXISTS ix_ratings_rated_user_created ON ratings (rated_user, created_at DESC);"
+
+def add_profile_rating_totals():
+    """Add and backfill profile rating totals"""
+    print("🔧 Adding rating totals to profiles...")
+    
+    with engine.begin() as conn:
+        try:
+            conn.execute(text(ADD_COLUMNS_SQL))
+            # Block rating writes until the backfill is done
+            conn.execute(text("LOCK TABLE ratings IN SHARE MODE;"))
+            conn.execute(text(DROP_TRIGGER_SQL))
+            conn.execute(text(BACKFILL_SQL))
+            conn.execute(text(CREATE_INDEX_SQL))
+            conn.execute(text("DROP MATERIALIZED VIEW IF EXISTS provider_rating_summary;"))
+            print('✅ Added rating totals to profiles successfully')
+        except Exception as e:
+            print(f'❌ Error: {e}')
+            raise
+
+if __name__ == "__main__":
+    add_profile_rating_totals()
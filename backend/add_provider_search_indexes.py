@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Add indexes backing provider search filters
+"""
+
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.database import engine
+from sqlalchemy import text
+
+INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_profiles_services_gin ON profiles USING GIN (services_offered);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_profiles_languages_gin ON profiles USING GIN (languages);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_profiles_search ON profiles (verification_status, hourly_rate) INCLUDE (user_id);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_active_role ON users (role, id) WHERE is_active = true;",
+    # Lets location ILIKE '%...%' use an index; only created here since it needs pg_trgm
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_profiles_location_trgm ON profiles USING GIN (location gin_trgm_ops);",
+]
+
+def add_provider_search_indexes():
+    """Create provider search indexes without locking the table against writes"""
+    print("🔧 Adding provider search indexes...")
+    
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        try:
+            for statement in INDEXES:
+                conn.execute(text(statement))
+            print('✅ Added provider search indexes successfully')
+        except Exception as e:
+            print(f'❌ Error: {e}')
+            raise
+
+if __name__ == "__main__":
+    add_provider_search_indexes()
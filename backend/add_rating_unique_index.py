@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Add the unique index that allows one rating per booking per rater
+"""
+
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.database import engine
+from sqlalchemy import text
+
+# Duplicate (booking_id, rated_by) pairs must be removed first or the build fails
+FIND_DUPLICATES_SQL = """
+SELECT booking_id, rated_by, COUNT(*) FROM ratings
+GROUP BY booking_id, rated_by
+HAVING COUNT(*) > 1;
+"""
+
+CREATE_INDEX_SQL = "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_rating_booking_rater ON ratings (booking_id, rated_by);"
+
+def add_rating_unique_index():
+    """Create the ratings unique index without locking the table against writes"""
+    print("🔧 Adding unique index on ratings (booking_id, rated_by)...")
+    
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        try:
+            duplicates = conn.execute(text(FIND_DUPLICATES_SQL)).fetchall()
+            if duplicates:
+                print(f'❌ Found {len(duplicates)} booking/rater pairs with more than one rating; resolve them first')
+                for booking_id, rated_by, count in duplicates:
+                    print(f'   booking {booking_id}, rater {rated_by}: {count} ratings')
+                sys.exit(1)
+            
+            conn.execute(text(CREATE_INDEX_SQL))
+            print('✅ Added ratings unique index successfully')
+        except Exception as e:
+            print(f'❌ Error: {e}')
+            raise
+
+if __name__ == "__main__":
+    add_rating_unique_index()
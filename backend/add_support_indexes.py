@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Add indexes backing support ticket lists and ticket message threads
+"""
+
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.database import engine
+from sqlalchemy import text
+
+INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_support_tickets_user_created ON support_tickets (user_id, created_at DESC);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_support_tickets_status_priority ON support_tickets (status, priority);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_support_tickets_agent ON support_tickets (assigned_agent) WHERE assigned_agent IS NOT NULL;",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_support_messages_ticket_created ON support_messages (ticket_id, created_at);",
+]
+
+def add_support_indexes():
+    """Create support indexes without locking the table against writes"""
+    print("🔧 Adding support indexes...")
+    
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        try:
+            for statement in INDEXES:
+                conn.execute(text(statement))
+            print('✅ Added support indexes successfully')
+        except Exception as e:
+            print(f'❌ Error: {e}')
+            raise
+
+if __name__ == "__main__":
+    add_support_indexes()
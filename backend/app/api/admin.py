@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
-from typing import List, Optional
-from datetime import datetime, timedelta
+from sqlalchemy.orm import Session, aliased, contains_eager
+from sqlalchemy import func, and_, or_, text, case, select, update
+from sqlalchemy.exc import IntegrityError, ProgrammingError
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta, timezone
 from app.core.deps import get_db, get_admin_user, get_super_admin_user, require_role
 from app.models.user import User, UserRole
 from app.models.booking import Booking, BookingStatus
@@ -12,13 +13,29 @@ from app.models.dispute import Dispute, DisputeStatus
 from app.models.support import SupportTicket, SupportStatus
 from app.models.token import TokenTransaction
 from app.services.assignment import get_employee_assignments, get_assignment_statistics, reassign_task
+from app.services.cache import cache_get_or_set, cache_delete, invalidate_provider
 from app.core.security import get_password_hash
 from pydantic import BaseModel, EmailStr
+import asyncio
 import secrets
-import string
 
 router = APIRouter()
 
+# Dashboard counts are stale-tolerant, so serve them from Redis for a short window
+DASHBOARD_STATS_CACHE_KEY = "v1:admin:dashboard:stats"
+DASHBOARD_STATS_CACHE_TTL = 60  # seconds
+# PostgreSQL materialized view refreshed on a schedule (see create_dashboard_stats_view.py)
+DASHBOARD_STATS_VIEW = "mv_admin_dashboard_stats"
+
+TEMP_PASSWORD_SYMBOLS = "!@#$%^&*"
+
+def generate_temp_password() -> str:
+    """Generate a 12 character temporary password containing at least one symbol"""
+    # token_urlsafe(9) encodes 9 random bytes as 12 URL-safe characters
+    password = secrets.token_urlsafe(9)
+    position = secrets.randbelow(len(password))
+    return password[:position] + secrets.choice(TEMP_PASSWORD_SYMBOLS) + password[position + 1:]
+
 class AdminDashboardStats(BaseModel):
     total_users: int
     total_providers: int
@@ -29,6 +46,7 @@ class AdminDashboardStats(BaseModel):
     open_support_tickets: int
     total_revenue: float
     platform_commission: float
+    refreshed_at: str
 
 class UserManagementResponse(BaseModel):
     id: int
@@ -39,6 +57,13 @@ class UserManagementResponse(BaseModel):
     created_at: str
     last_login: Optional[str]
 
+class EmployeeListResponse(BaseModel):
+    employees: List[UserManagementResponse]
+    page: int
+    limit: int
+    total: int
+    role_counts: Dict[str, int]
+
 class VerificationQueueItem(BaseModel):
     id: int
     user_id: int
@@ -49,6 +74,12 @@ class VerificationQueueItem(BaseModel):
     assigned_employee: Optional[int]
     created_at: str
 
+class VerificationQueueResponse(BaseModel):
+    verifications: List[VerificationQueueItem]
+    page: int
+    limit: int
+    total: int
+
 class EmployeeCreate(BaseModel):
     email: EmailStr
     role: UserRole
@@ -63,37 +94,90 @@ class EmployeeResponse(BaseModel):
     created_at: str
     temporary_password: Optional[str] = None
 
-@router.get("/dashboard", response_model=AdminDashboardStats)
-async def get_admin_dashboard(
-    current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
-):
-    """Get admin dashboard statistics"""
+class BulkVerificationApprove(BaseModel):
+    ids: List[int]
+
+class BulkVerificationReject(BaseModel):
+    ids: List[int]
+    reason: str
+
+def refresh_dashboard_stats_view(db: Session) -> bool:
+    """Refresh the dashboard statistics view without blocking readers; False if it doesn't exist"""
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    try:
+        db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {DASHBOARD_STATS_VIEW}"))
+        db.commit()
+        return True
+    except ProgrammingError:
+        # View not created yet (see create_dashboard_stats_view.py)
+        db.rollback()
+        return False
+
+def read_dashboard_stats_view(db: Session):
+    """The dashboard statistics view's single row, or None if the view doesn't exist"""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    try:
+        return db.execute(text(f"SELECT * FROM {DASHBOARD_STATS_VIEW}")).mappings().first()
+    except ProgrammingError:
+        # View not created yet (see create_dashboard_stats_view.py)
+        db.rollback()
+        return None
+
+def compute_dashboard_stats(db: Session) -> dict:
+    """
+    Compute admin dashboard statistics, preferring the precomputed materialized view.
+    The view is never refreshed here; refreshed_at tells the caller how old it is.
+    """
+    row = read_dashboard_stats_view(db)
     
-    # User statistics
-    total_users = db.query(User).count()
-    total_providers = db.query(User).filter(User.role == UserRole.PROVIDER).count()
-    total_seekers = db.query(User).filter(User.role == UserRole.SEEKER).count()
+    if row is None:
+        return compute_live_dashboard_stats(db)
     
-    # Verification queue
-    pending_verifications = db.query(Verification).filter(
+    total_revenue = (row["purchased_tokens"] or 0) * 100  # Convert tokens to INR
+    return {
+        "total_users": row["total_users"],
+        "total_providers": row["total_providers"],
+        "total_seekers": row["total_seekers"],
+        "pending_verifications": row["pending_verifications"],
+        "active_bookings": row["active_bookings"],
+        "open_disputes": row["open_disputes"],
+        "open_support_tickets": row["open_support_tickets"],
+        "total_revenue": total_revenue,
+        "platform_commission": total_revenue * 0.15,  # 15% commission
+        "refreshed_at": row["refreshed_at"].isoformat()
+    }
+
+def compute_live_dashboard_stats(db: Session) -> dict:
+    """Compute admin dashboard statistics directly from the underlying tables"""
+    # User statistics, verification queue and active bookings in a single round trip
+    pending_verifications_q = select(func.count(Verification.id)).where(
         Verification.status == VerificationStatus.PENDING
-    ).count()
-    
-    # Active bookings
-    active_bookings = db.query(Booking).filter(
+    ).scalar_subquery()
+    active_bookings_q = select(func.count(Booking.id)).where(
         Booking.status.in_([BookingStatus.PENDING, BookingStatus.CONFIRMED, BookingStatus.IN_PROGRESS])
+    ).scalar_subquery()
+    
+    (
+        total_users,
+        total_providers,
+        total_seekers,
+        pending_verifications,
+        active_bookings
+    ) = db.query(
+        func.count(User.id),
+        func.count(case((User.role == UserRole.PROVIDER, 1))),
+        func.count(case((User.role == UserRole.SEEKER, 1))),
+        pending_verifications_q,
+        active_bookings_q
+    ).one()
+    
+    # Open disputes
+    open_disputes = db.query(Dispute).filter(
+        Dispute.status.in_([DisputeStatus.OPEN, DisputeStatus.INVESTIGATING])
     ).count()
     
-    # Open disputes - handle case where assigned_manager column might not exist
-    try:
-        open_disputes = db.query(Dispute).filter(
-            Dispute.status.in_([DisputeStatus.OPEN, DisputeStatus.INVESTIGATING])
-        ).count()
-    except Exception:
-        # Fallback if dispute table doesn't have all columns
-        open_disputes = 0
-    
     # Open support tickets
     try:
         open_support_tickets = db.query(SupportTicket).filter(
@@ -115,19 +199,46 @@ async def get_admin_dashboard(
         total_revenue = 0
         platform_commission = 0
     
-    return AdminDashboardStats(
-        total_users=total_users,
-        total_providers=total_providers,
-        total_seekers=total_seekers,
-        pending_verifications=pending_verifications,
-        active_bookings=active_bookings,
-        open_disputes=open_disputes,
-        open_support_tickets=open_support_tickets,
-        total_revenue=total_revenue,
-        platform_commission=platform_commission
+    return {
+        "total_users": total_users,
+        "total_providers": total_providers,
+        "total_seekers": total_seekers,
+        "pending_verifications": pending_verifications,
+        "active_bookings": active_bookings,
+        "open_disputes": open_disputes,
+        "open_support_tickets": open_support_tickets,
+        "total_revenue": total_revenue,
+        "platform_commission": platform_commission,
+        "refreshed_at": datetime.now(timezone.utc).isoformat()
+    }
+
+@router.get("/dashboard", response_model=AdminDashboardStats)
+def get_admin_dashboard(
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Get admin dashboard statistics"""
+    stats = cache_get_or_set(
+        DASHBOARD_STATS_CACHE_KEY,
+        DASHBOARD_STATS_CACHE_TTL,
+        lambda: compute_dashboard_stats(db)
     )
+    return AdminDashboardStats(**stats)
+
+@router.post("/dashboard/cache/invalidate")
+def invalidate_dashboard_cache(
+    current_user: User = Depends(get_super_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Refresh the dashboard statistics view and clear the cached copy"""
+    refresh_dashboard_stats_view(db)
+    cache_delete(DASHBOARD_STATS_CACHE_KEY)
+    stats = compute_dashboard_stats(db)
+    return {"success": True, "message": "Dashboard statistics refreshed", "refreshed_at": stats["refreshed_at"]}
 
-@router.get("/users", response_model=List[UserManagementResponse])
+# The list endpoints below return plain dicts; the response models are kept for
+# the API docs only, so rows aren't validated a second time on the way out
+@router.get("/users", response_model=None, responses={200: {"model": List[UserManagementResponse]}})
 async def get_all_users(
     current_user: User = Depends(get_admin_user),
     role_filter: Optional[UserRole] = None,
@@ -138,7 +249,10 @@ async def get_all_users(
     db: Session = Depends(get_db)
 ):
     """Get all users for admin management"""
-    query = db.query(User)
+    # Select only the listed columns; plain rows skip ORM identity-map bookkeeping
+    query = db.query(
+        User.id, User.email, User.role, User.verification_status, User.is_active, User.created_at
+    )
     
     if role_filter:
         query = query.filter(User.role == role_filter)
@@ -154,15 +268,15 @@ async def get_all_users(
     users = query.order_by(User.created_at.desc()).offset(offset).limit(limit).all()
     
     return [
-        UserManagementResponse(
-            id=user.id,
-            email=user.email,
-            role=user.role,
-            verification_status=user.verification_status,
-            is_active=user.is_active,
-            created_at=user.created_at.isoformat(),
-            last_login=None  # Implement login tracking if needed
-        )
+        {
+            "id": user.id,
+            "email": user.email,
+            "role": user.role,
+            "verification_status": user.verification_status,
+            "is_active": user.is_active,
+            "created_at": user.created_at.isoformat(),
+            "last_login": None  # Implement login tracking if needed
+        }
         for user in users
     ]
 
@@ -173,18 +287,24 @@ async def activate_user(
     db: Session = Depends(get_db)
 ):
     """Activate/deactivate user account"""
-    user = db.query(User).filter(User.id == user_id).first()
+    # Toggle in a single atomic statement so concurrent toggles can't race
+    row = db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(is_active=~User.is_active)
+        .returning(User.is_active)
+    ).first()
     
-    if not user:
+    if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    user.is_active = not user.is_active
     db.commit()
+    invalidate_provider(user_id)
     
-    action = "activated" if user.is_active else "deactivated"
+    action = "activated" if row.is_active else "deactivated"
     return {"success": True, "message": f"User {action} successfully"}
 
 @router.post("/employees", response_model=EmployeeResponse)
@@ -202,21 +322,9 @@ async def create_employee(
             detail="Can only create employee or manager accounts"
         )
     
-    # Check if user with email already exists
-    existing_user = db.query(User).filter(User.email == employee_data.email).first()
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="User with this email already exists"
-        )
-    
     # Generate temporary password
-    def generate_temp_password(length=12):
-        characters = string.ascii_letters + string.digits + "!@#$%^&*"
-        return ''.join(secrets.choice(characters) for _ in range(length))
-    
     temp_password = generate_temp_password()
-    hashed_password = get_password_hash(temp_password)
+    hashed_password = await asyncio.to_thread(get_password_hash, temp_password)
     
     # Create new employee user
     new_employee = User(
@@ -231,7 +339,15 @@ async def create_employee(
     )
     
     db.add(new_employee)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        # Duplicates are rejected by the unique constraints on email/phone
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User with this email already exists" if "email" in str(e.orig) else "User with this phone already exists"
+        )
     db.refresh(new_employee)
     
     return EmployeeResponse(
@@ -244,74 +360,97 @@ async def create_employee(
         temporary_password=temp_password  # Return temp password for admin to share
     )
 
-@router.get("/employees", response_model=List[UserManagementResponse])
+@router.get("/employees", response_model=None, responses={200: {"model": EmployeeListResponse}})
 async def get_employees(
     current_user: User = Depends(get_admin_user),
     role_filter: Optional[UserRole] = None,
     is_active: Optional[bool] = None,
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, le=100),
     db: Session = Depends(get_db)
 ):
-    """Get all employees and managers"""
-    query = db.query(User).filter(
-        User.role.in_([UserRole.EMPLOYEE, UserRole.MANAGER])
-    )
+    """Get all employees and managers, with totals per role"""
+    filters = [User.role.in_([UserRole.EMPLOYEE, UserRole.MANAGER])]
     
     if role_filter and role_filter in [UserRole.EMPLOYEE, UserRole.MANAGER]:
-        query = query.filter(User.role == role_filter)
+        filters.append(User.role == role_filter)
     
     if is_active is not None:
-        query = query.filter(User.is_active == is_active)
+        filters.append(User.is_active == is_active)
     
-    employees = query.order_by(User.created_at.desc()).all()
+    # Per-role totals over every matching row, not just this page
+    role_counts = {UserRole.EMPLOYEE.value: 0, UserRole.MANAGER.value: 0}
+    role_counts.update(
+        (role.value, count)
+        for role, count in db.query(User.role, func.count(User.id)).filter(*filters).group_by(User.role)
+    )
     
-    return [
-        UserManagementResponse(
-            id=employee.id,
-            email=employee.email,
-            role=employee.role,
-            verification_status=employee.verification_status,
-            is_active=employee.is_active,
-            created_at=employee.created_at.isoformat(),
-            last_login=None
-        )
-        for employee in employees
-    ]
+    # Pagination
+    offset = (page - 1) * limit
+    employees = db.query(
+        User.id, User.email, User.role, User.verification_status, User.is_active, User.created_at
+    ).filter(*filters).order_by(User.created_at.desc()).offset(offset).limit(limit).all()
+    
+    return {
+        "employees": [
+            {
+                "id": employee.id,
+                "email": employee.email,
+                "role": employee.role,
+                "verification_status": employee.verification_status,
+                "is_active": employee.is_active,
+                "created_at": employee.created_at.isoformat(),
+                "last_login": None
+            }
+            for employee in employees
+        ],
+        "page": page,
+        "limit": limit,
+        "total": sum(role_counts.values()),
+        "role_counts": role_counts
+    }
 
-@router.get("/verification-queue", response_model=List[VerificationQueueItem])
+@router.get("/verification-queue", response_model=None, responses={200: {"model": VerificationQueueResponse}})
 async def get_verification_queue(
     current_user: User = Depends(get_admin_user),
     status_filter: Optional[VerificationStatus] = None,
     assigned_to_me: bool = False,
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, le=100),
     db: Session = Depends(get_db)
 ):
     """Get verification queue for admin management"""
-    try:
-        query = db.query(Verification).join(User)
-        
-        if status_filter:
-            query = query.filter(Verification.status == status_filter)
-        
-        if assigned_to_me:
-            query = query.filter(Verification.employee_id == current_user.id)
-        
-        verifications = query.order_by(Verification.created_at.asc()).all()
-        
-        return [
-            VerificationQueueItem(
-                id=verification.id,
-                user_id=verification.user_id,
-                user_email=verification.user.email,
-                verification_type=verification.verification_type,
-                status=verification.status,
-                documents=verification.documents or [],
-                assigned_employee=getattr(verification, 'employee_id', None),
-                created_at=verification.created_at.isoformat()
-            )
-            for verification in verifications
-        ]
-    except Exception:
-        # Return empty list if table structure is incompatible
-        return []
+    # Join on the verified user (not the employee) and populate Verification.user from it
+    query = db.query(Verification).join(Verification.user).options(
+        contains_eager(Verification.user)
+    )
+    
+    if status_filter:
+        query = query.filter(Verification.status == status_filter)
+    
+    if assigned_to_me:
+        query = query.filter(Verification.employee_id == current_user.id)
+    
+    # Pagination
+    total = query.count()
+    offset = (page - 1) * limit
+    verifications = query.order_by(Verification.created_at.asc()).offset(offset).limit(limit).all()
+    
+    verification_data = [
+        {
+            "id": verification.id,
+            "user_id": verification.user_id,
+            "user_email": verification.user.email,
+            "verification_type": verification.verification_type,
+            "status": verification.status,
+            "documents": verification.documents or [],
+            "assigned_employee": verification.employee_id,
+            "created_at": verification.created_at.isoformat()
+        }
+        for verification in verifications
+    ]
+    
+    return {"verifications": verification_data, "page": page, "limit": limit, "total": total}
 
 @router.put("/verification/{verification_id}/approve")
 async def approve_verification(
@@ -385,31 +524,108 @@ async def reject_verification(
     
     return {"success": True, "message": "Verification rejected"}
 
+def bulk_update_verifications(
+    db: Session,
+    current_user: User,
+    ids: List[int],
+    values: dict,
+    user_verification_status: str
+) -> int:
+    """Apply values to the given verifications and their users in one transaction"""
+    query = db.query(Verification).filter(Verification.id.in_(ids))
+    
+    # Employees can only act on verifications assigned to them
+    if current_user.role == UserRole.EMPLOYEE:
+        query = query.filter(Verification.employee_id == current_user.id)
+    
+    user_ids = [user_id for (user_id,) in query.with_entities(Verification.user_id).all()]
+    if not user_ids:
+        return 0
+    
+    updated = query.update(
+        {**values, Verification.employee_id: current_user.id, Verification.completed_at: func.now()},
+        synchronize_session=False
+    )
+    db.query(User).filter(User.id.in_(user_ids)).update(
+        {User.verification_status: user_verification_status},
+        synchronize_session=False
+    )
+    db.commit()
+    
+    return updated
+
+@router.post("/verifications/bulk-approve")
+async def bulk_approve_verifications(
+    request: BulkVerificationApprove,
+    current_user: User = Depends(require_role([UserRole.EMPLOYEE, UserRole.MANAGER, UserRole.ADMIN])),
+    db: Session = Depends(get_db)
+):
+    """Approve several user verifications at once"""
+    updated = bulk_update_verifications(
+        db, current_user, request.ids,
+        {Verification.status: VerificationStatus.APPROVED},
+        "verified"
+    )
+    return {"success": True, "updated": updated, "message": f"{updated} verifications approved"}
+
+@router.post("/verifications/bulk-reject")
+async def bulk_reject_verifications(
+    request: BulkVerificationReject,
+    current_user: User = Depends(require_role([UserRole.EMPLOYEE, UserRole.MANAGER, UserRole.ADMIN])),
+    db: Session = Depends(get_db)
+):
+    """Reject several user verifications at once"""
+    updated = bulk_update_verifications(
+        db, current_user, request.ids,
+        {Verification.status: VerificationStatus.REJECTED, Verification.rejection_reason: request.reason},
+        "rejected"
+    )
+    return {"success": True, "updated": updated, "message": f"{updated} verifications rejected"}
+
 @router.get("/bookings/monitoring")
 async def get_booking_monitoring_queue(
     current_user: User = Depends(require_role([UserRole.EMPLOYEE, UserRole.MANAGER, UserRole.ADMIN])),
     assigned_to_me: bool = False,
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, le=100),
     db: Session = Depends(get_db)
 ):
     """Get bookings assigned for monitoring"""
-    query = db.query(Booking).filter(
+    # Join both parties in the same query and fetch only the columns we return
+    seeker = aliased(User)
+    provider = aliased(User)
+    query = db.query(
+        Booking.id,
+        seeker.email.label("seeker_email"),
+        provider.email.label("provider_email"),
+        Booking.start_time,
+        Booking.duration_hours,
+        Booking.status,
+        Booking.assigned_employee,
+        Booking.location,
+        Booking.total_tokens
+    ).join(
+        seeker, Booking.seeker_id == seeker.id
+    ).join(
+        provider, Booking.provider_id == provider.id
+    ).filter(
         Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.IN_PROGRESS])
     )
     
     if assigned_to_me:
         query = query.filter(Booking.assigned_employee == current_user.id)
     
-    bookings = query.order_by(Booking.start_time.asc()).all()
+    # Pagination
+    total = query.count()
+    offset = (page - 1) * limit
+    bookings = query.order_by(Booking.start_time.asc()).offset(offset).limit(limit).all()
     
     booking_data = []
     for booking in bookings:
-        seeker = db.query(User).filter(User.id == booking.seeker_id).first()
-        provider = db.query(User).filter(User.id == booking.provider_id).first()
-        
         booking_data.append({
             "id": booking.id,
-            "seeker_email": seeker.email,
-            "provider_email": provider.email,
+            "seeker_email": booking.seeker_email,
+            "provider_email": booking.provider_email,
             "start_time": booking.start_time.isoformat(),
             "duration_hours": booking.duration_hours,
             "status": booking.status,
@@ -418,54 +634,65 @@ async def get_booking_monitoring_queue(
             "total_tokens": booking.total_tokens
         })
     
-    return {"bookings": booking_data}
+    return {"bookings": booking_data, "page": page, "limit": limit, "total": total}
 
 @router.get("/disputes")
 async def get_disputes(
     current_user: User = Depends(require_role([UserRole.MANAGER, UserRole.ADMIN])),
     status_filter: Optional[DisputeStatus] = None,
     assigned_to_me: bool = False,
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, le=100),
     db: Session = Depends(get_db)
 ):
     """Get all disputes for admin management"""
-    try:
-        query = db.query(Dispute)
-        
-        if status_filter:
-            query = query.filter(Dispute.status == status_filter)
-        
-        if assigned_to_me:
-            query = query.filter(Dispute.assigned_manager == current_user.id)
-        
-        disputes = query.order_by(Dispute.created_at.desc()).all()
-        
-        dispute_data = []
-        for dispute in disputes:
-            booking = db.query(Booking).filter(Booking.id == dispute.booking_id).first()
-            reporter = db.query(User).filter(User.id == dispute.reported_by).first()
-            
-            # Handle potential missing assigned_manager field
-            assigned_manager = getattr(dispute, 'assigned_manager', None)
-            
-            dispute_data.append({
-                "id": dispute.id,
-                "booking_id": dispute.booking_id,
-                "reporter_email": reporter.email if reporter else "Unknown",
-                "dispute_type": dispute.dispute_type,
-                "description": dispute.description,
-                "status": dispute.status,
-                "assigned_manager": assigned_manager,
-                "created_at": dispute.created_at.isoformat(),
-                "booking_details": {
-                    "start_time": booking.start_time.isoformat() if booking else None,
-                    "total_tokens": booking.total_tokens if booking else None
-                }
-            })
-        
-        return {"disputes": dispute_data}
-    except Exception as e:
-        # Return empty list if table structure is incompatible
-        return {"disputes": []}
+    # Join booking and reporter in the same query and fetch only the columns we return
+    query = db.query(
+        Dispute.id,
+        Dispute.booking_id,
+        User.email.label("reporter_email"),
+        Dispute.dispute_type,
+        Dispute.description,
+        Dispute.status,
+        Dispute.assigned_manager,
+        Dispute.created_at,
+        Booking.start_time.label("booking_start_time"),
+        Booking.total_tokens.label("booking_total_tokens")
+    ).outerjoin(
+        Booking, Dispute.booking_id == Booking.id
+    ).outerjoin(
+        User, Dispute.reported_by == User.id
+    )
+    
+    if status_filter:
+        query = query.filter(Dispute.status == status_filter)
+    
+    if assigned_to_me:
+        query = query.filter(Dispute.assigned_manager == current_user.id)
+    
+    # Pagination
+    total = query.count()
+    offset = (page - 1) * limit
+    disputes = query.order_by(Dispute.created_at.desc()).offset(offset).limit(limit).all()
+    
+    dispute_data = []
+    for dispute in disputes:
+        dispute_data.append({
+            "id": dispute.id,
+            "booking_id": dispute.booking_id,
+            "reporter_email": dispute.reporter_email or "Unknown",
+            "dispute_type": dispute.dispute_type,
+            "description": dispute.description,
+            "status": dispute.status,
+            "assigned_manager": dispute.assigned_manager,
+            "created_at": dispute.created_at.isoformat(),
+            "booking_details": {
+                "start_time": dispute.booking_start_time.isoformat() if dispute.booking_start_time else None,
+                "total_tokens": dispute.booking_total_tokens
+            }
+        })
+    
+    return {"disputes": dispute_data, "page": page, "limit": limit, "total": total}
 
 @router.put("/disputes/{dispute_id}/assign")
 async def assign_dispute(
@@ -607,23 +834,34 @@ async def get_revenue_analytics(
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=days)
     
-    # Daily revenue
+    # Completed booking value for the period, evaluated inside the daily query
+    bookings_revenue_q = select(func.coalesce(func.sum(Booking.total_tokens), 0)).where(
+        Booking.status == BookingStatus.COMPLETED,
+        Booking.created_at >= start_date
+    ).scalar_subquery()
+    
+    # Daily revenue, with the period total computed by a window over the daily sums
     daily_revenue = db.query(
         func.date(TokenTransaction.created_at).label('date'),
         func.sum(TokenTransaction.amount).label('tokens'),
-        func.count(TokenTransaction.id).label('transactions')
+        func.count(TokenTransaction.id).label('transactions'),
+        func.sum(func.sum(TokenTransaction.amount)).over().label('total_tokens'),
+        bookings_revenue_q.label('bookings_revenue')
     ).filter(
         TokenTransaction.type == "purchase",
         TokenTransaction.status == "completed",
         TokenTransaction.created_at >= start_date
     ).group_by(func.date(TokenTransaction.created_at)).all()
     
-    # Platform commission
-    total_bookings_revenue = db.query(func.sum(Booking.total_tokens)).filter(
-        Booking.status == BookingStatus.COMPLETED,
-        Booking.created_at >= start_date
-    ).scalar() or 0
+    if daily_revenue:
+        total_tokens = daily_revenue[0].total_tokens or 0
+        total_bookings_revenue = daily_revenue[0].bookings_revenue or 0
+    else:
+        # No purchases in the period, so the booking total needs its own query
+        total_tokens = 0
+        total_bookings_revenue = db.query(bookings_revenue_q).scalar() or 0
     
+    # Platform commission
     platform_commission = total_bookings_revenue * 0.15
     
     return {
@@ -637,6 +875,7 @@ async def get_revenue_analytics(
             }
             for day in daily_revenue
         ],
+        "total_revenue_inr": total_tokens * 100,
         "total_platform_commission": platform_commission * 100,  # Convert to INR
         "total_bookings_revenue": total_bookings_revenue * 100
     }
\ No newline at end of file
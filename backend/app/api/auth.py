@@ -1,7 +1,9 @@
+import asyncio
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from app.core.config import settings
 from app.core.security import create_access_token, verify_password, get_password_hash
 from app.core.deps import get_db, get_current_active_user
@@ -14,16 +16,26 @@ from app.services.sms import send_verification_sms
 
 router = APIRouter()
 
-@router.post("/register", response_model=UserResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
+async def send_registration_verifications(email: str, user_id: int, phone: str = None):
+    """Send the verification email and SMS for a newly registered user"""
+    try:
+        await send_verification_email(email, user_id)
+    except Exception as e:
+        print(f"Failed to send verification email: {e}")
     
+    # Send SMS verification if phone provided
+    if phone:
+        try:
+            await send_verification_sms(phone)
+        except Exception as e:
+            print(f"Failed to send verification SMS: {e}")
+
+@router.post("/register", response_model=UserResponse)
+async def register(
+    user_data: UserCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
     # Validate age confirmation
     if not user_data.age_confirmed:
         raise HTTPException(
@@ -31,8 +43,8 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
             detail="Age confirmation required - you must be 18 or older"
         )
     
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    # Create new user (bcrypt runs in a worker thread so it doesn't block the event loop)
+    hashed_password = await asyncio.to_thread(get_password_hash, user_data.password)
     user = User(
         email=user_data.email,
         password_hash=hashed_password,
@@ -42,8 +54,15 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    try:
+        db.flush()  # Assigns user.id without ending the transaction
+    except IntegrityError as e:
+        # Duplicates are rejected by the unique constraints on email/phone
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered" if "email" in str(e.orig) else "Phone number already registered"
+        )
     
     # Create profile for providers
     if user.role == UserRole.PROVIDER:
@@ -55,19 +74,10 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     db.add(token_wallet)
     
     db.commit()
+    db.refresh(user)
     
-    # Send verification email
-    try:
-        await send_verification_email(user.email, user.id)
-    except Exception as e:
-        print(f"Failed to send verification email: {e}")
-    
-    # Send SMS verification if phone provided
-    if user.phone:
-        try:
-            await send_verification_sms(user.phone)
-        except Exception as e:
-            print(f"Failed to send verification SMS: {e}")
+    # Send verification email/SMS after the response so registration isn't held up by them
+    background_tasks.add_task(send_registration_verifications, user.email, user.id, user.phone)
     
     return user
 
@@ -75,7 +85,11 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 async def login(user_data: UserLogin, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.email == user_data.email).first()
     
-    if not user or not verify_password(user_data.password, user.password_hash):
+    password_valid = user is not None and await asyncio.to_thread(
+        verify_password, user_data.password, user.password_hash
+    )
+    
+    if not password_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from sqlalchemy.orm import Session, aliased, load_only
+from sqlalchemy import case, select, text, union_all, update
+from sqlalchemy.exc import OperationalError
 from typing import List, Optional
-from datetime import datetime, timedelta, time
+from datetime import datetime, timedelta, time, timezone
 from app.core.deps import get_db, get_current_active_user, require_role
 from app.models.user import User, UserRole
 from app.models.booking import Booking, BookingStatus, BookingType
@@ -13,10 +15,28 @@ from app.core.config import settings
 from app.services.pricing import PricingService
 from app.services.otp import OTPService
 from app.services.websocket import notify_booking_update
-from pydantic import BaseModel
+from app.services.cache import cache_get_or_set, provider_cache_key
+from pydantic import BaseModel, field_validator
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Staff roles may view any booking; they don't need the provider's display name
+STAFF_ROLES = frozenset({UserRole.ADMIN, UserRole.SUPER_ADMIN, UserRole.MANAGER, UserRole.EMPLOYEE})
+
+# How long a status change waits for another request holding the booking row
+BOOKING_LOCK_TIMEOUT = "2s"
+
+# Provider details change rarely and are invalidated on write, so a longer TTL is fine
+PROVIDER_CACHE_TTL = 600
+
+def as_utc(value: datetime) -> datetime:
+    """Treat naive timestamps (from clients, or SQLite) as UTC"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
 class BookingCreateRequest(BaseModel):
     provider_id: int
     start_time: datetime
@@ -24,82 +44,172 @@ class BookingCreateRequest(BaseModel):
     booking_type: BookingType
     location: Optional[str] = None
     special_requests: Optional[str] = None
+    
+    @field_validator("start_time")
+    @classmethod
+    def assume_utc(cls, value: datetime) -> datetime:
+        # Clients may send naive timestamps; they are UTC
+        return as_utc(value)
 
 class BookingResponse(BaseModel):
     id: int
     provider_id: int
-    provider_name: str
+    provider_name: str = "Provider"
     seeker_id: int
-    start_time: str
+    start_time: datetime
     duration_hours: int
     total_tokens: int
     booking_type: BookingType
     status: BookingStatus
     location: Optional[str]
     special_requests: Optional[str]
-    created_at: str
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
 
 class BookingUpdateRequest(BaseModel):
     status: BookingStatus
     otp_code: Optional[str] = None
 
+# Columns BookingResponse reads; list queries load only these
+BOOKING_RESPONSE_COLUMNS = (
+    Booking.id, Booking.provider_id, Booking.seeker_id, Booking.start_time,
+    Booking.duration_hours, Booking.total_tokens, Booking.booking_type, Booking.status,
+    Booking.location, Booking.special_requests, Booking.created_at
+)
+
+def to_booking_response(booking: Booking, provider_name: Optional[str]) -> BookingResponse:
+    """Build a BookingResponse from the booking's own columns; no relationships are touched"""
+    response = BookingResponse.model_validate(booking)
+    response.provider_name = provider_name or "Provider"
+    return response
+
 def calculate_booking_cost(db: Session, provider_hourly_rate: int, provider_id: int, duration_hours: int) -> int:
     """Calculate total cost using PricingService with platform fees"""
     cost_breakdown = PricingService.calculate_booking_cost(db, provider_hourly_rate, provider_id, duration_hours)
     return cost_breakdown["total_cost"]
 
-def assign_monitoring_employee(db: Session, booking_id: int) -> Optional[int]:
-    """Assign an employee to monitor the booking using round-robin"""
-    from app.services.assignment import get_next_available_employee
+async def send_booking_confirmations(recipients: List[str], booking_details: dict):
+    """Send the booking confirmation email to each recipient concurrently"""
+    results = await asyncio.gather(
+        *(send_booking_confirmation_email(email, booking_details) for email in recipients),
+        return_exceptions=True
+    )
+    for email, result in zip(recipients, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to send confirmation email to %s: %s", email, result)
+
+def adjust_wallet(db: Session, user_id: int, balance_delta: int = 0, escrow_delta: int = 0, min_balance: Optional[int] = None):
+    """
+    Atomically apply balance/escrow deltas to a user's wallet in one UPDATE.
+    Returns the updated (id, balance, escrow_balance) row, or None if the wallet
+    doesn't exist or holds less than min_balance.
+    """
+    stmt = update(Token).where(Token.user_id == user_id).values(
+        balance=Token.balance + balance_delta,
+        escrow_balance=Token.escrow_balance + escrow_delta
+    )
+    if min_balance is not None:
+        stmt = stmt.where(Token.balance >= min_balance)
     
-    employee_id = get_next_available_employee(db, "booking")
-    if employee_id:
-        # Create assignment record
-        from app.models.verification import Assignment, AssignmentType
-        assignment = Assignment(
-            item_id=booking_id,
-            item_type=AssignmentType.BOOKING,
-            employee_id=employee_id
+    return db.execute(
+        stmt.returning(Token.id, Token.balance, Token.escrow_balance)
+    ).first()
+
+def release_escrow(db: Session, seeker_id: int, provider_id: int, escrow_amount: int, earnings: int) -> dict:
+    """
+    Release escrow from the seeker's wallet and credit earnings to the provider's
+    in one UPDATE covering both rows. Returns the updated rows keyed by user_id.
+    """
+    rows = db.execute(
+        update(Token)
+        .where(Token.user_id.in_([seeker_id, provider_id]))
+        .values(
+            balance=Token.balance + case((Token.user_id == provider_id, earnings), else_=0),
+            escrow_balance=Token.escrow_balance - case((Token.user_id == seeker_id, escrow_amount), else_=0)
         )
-        db.add(assignment)
-        
-        # Update booking with assigned employee
-        booking = db.query(Booking).filter(Booking.id == booking_id).first()
-        if booking:
-            booking.assigned_employee = employee_id
+        .returning(Token.user_id, Token.id, Token.balance, Token.escrow_balance)
+    ).all()
+    return {row.user_id: row for row in rows}
+
+def lock_booking(db: Session, booking_id: int) -> Optional[Booking]:
+    """Load a booking with its row locked until commit so concurrent status changes serialize"""
+    if db.bind.dialect.name == "postgresql":
+        db.execute(text(f"SET LOCAL lock_timeout = '{BOOKING_LOCK_TIMEOUT}'"))
+    try:
+        return db.query(Booking).filter(Booking.id == booking_id).with_for_update().first()
+    except OperationalError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Booking is being updated, please try again"
+        )
+
+def get_provider_summary(db: Session, provider_id: int) -> Optional[dict]:
+    """Get the provider fields booking endpoints need, served from the cache when possible"""
+    def load() -> Optional[dict]:
+        # One round-trip for the user and their (possibly missing) profile
+        row = db.query(
+            User.email, User.role, User.is_active, Profile.name, Profile.hourly_rate
+        ).outerjoin(Profile, Profile.user_id == User.id).filter(User.id == provider_id).first()
+        if not row:
+            return None
+        return {
+            "email": row.email,
+            "role": row.role.value,
+            "is_active": row.is_active,
+            "name": row.name,
+            "hourly_rate": row.hourly_rate
+        }
+    
+    return cache_get_or_set(provider_cache_key(provider_id), PROVIDER_CACHE_TTL, load)
+
+def assign_monitoring_employee(db: Session, booking: Booking):
+    """
+    Pick an employee to monitor the booking using round-robin and record it on the booking.
+    Returns the Assignment record for the caller to add, or None if nobody is available.
+    """
+    from app.services.assignment import get_next_available_employee
+    from app.models.verification import Assignment, AssignmentType
     
-    return employee_id
+    employee_id = get_next_available_employee(db, "booking")
+    if not employee_id:
+        return None
+    
+    booking.assigned_employee = employee_id
+    return Assignment(
+        item_id=booking.id,
+        item_type=AssignmentType.BOOKING,
+        employee_id=employee_id
+    )
 
 @router.post("/create", response_model=BookingResponse)
 async def create_booking(
     request: BookingCreateRequest,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(require_role([UserRole.SEEKER])),
     db: Session = Depends(get_db)
 ):
     """Create a new booking"""
     # Validate provider exists and is available
-    provider = db.query(User).filter(
-        User.id == request.provider_id,
-        User.role == UserRole.PROVIDER,
-        User.is_active == True
-    ).first()
+    # The summary lookup does blocking Redis (and on a miss, DB) I/O
+    provider = await asyncio.to_thread(get_provider_summary, db, request.provider_id)
     
-    if not provider:
+    if not provider or provider["role"] != UserRole.PROVIDER.value or not provider["is_active"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Provider not found"
         )
     
-    # Get provider profile
-    profile = db.query(Profile).filter(Profile.user_id == request.provider_id).first()
-    if not profile or not profile.hourly_rate:
+    if not provider["hourly_rate"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Provider profile incomplete"
         )
     
     # Validate booking time
-    if request.start_time <= datetime.utcnow():
+    if request.start_time <= datetime.now(timezone.utc):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Booking time must be in the future"
@@ -112,15 +222,7 @@ async def create_booking(
         )
     
     # Calculate total cost
-    total_cost = calculate_booking_cost(db, profile.hourly_rate, request.provider_id, request.duration_hours)
-    
-    # Check seeker's token balance
-    seeker_wallet = db.query(Token).filter(Token.user_id == current_user.id).first()
-    if not seeker_wallet or seeker_wallet.balance < total_cost:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Insufficient tokens. Need {total_cost} tokens."
-        )
+    total_cost = calculate_booking_cost(db, provider["hourly_rate"], request.provider_id, request.duration_hours)
     
     # Skip conflict check for now - TODO: implement proper time conflict detection
     
@@ -137,13 +239,20 @@ async def create_booking(
         status=BookingStatus.PENDING
     )
     
+    # Move tokens to escrow; the balance guard makes the check and debit one atomic statement
+    seeker_wallet = adjust_wallet(
+        db, current_user.id, balance_delta=-total_cost, escrow_delta=total_cost, min_balance=total_cost
+    )
+    if seeker_wallet is None:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Insufficient tokens. Need {total_cost} tokens."
+        )
+    
     db.add(booking)
     db.flush()  # Get booking ID
     
-    # Move tokens to escrow
-    seeker_wallet.balance -= total_cost
-    seeker_wallet.escrow_balance += total_cost
-    
     # Create escrow transaction
     escrow_transaction = TokenTransaction(
         user_id=current_user.id,
@@ -157,26 +266,23 @@ async def create_booking(
         status=TransactionStatus.COMPLETED
     )
     
-    db.add(escrow_transaction)
-    
-    # Assign monitoring employee
-    assigned_employee = assign_monitoring_employee(db, booking.id)
+    # Assign monitoring employee and write both records in the commit's single flush
+    assignment = assign_monitoring_employee(db, booking)
+    db.add_all([escrow_transaction, assignment] if assignment else [escrow_transaction])
     
     db.commit()
     db.refresh(booking)
     
-    # Send confirmation emails
-    try:
-        booking_details = {
-            "booking_id": booking.id,
-            "start_time": booking.start_time.strftime("%Y-%m-%d %H:%M"),
-            "duration_hours": booking.duration_hours,
-            "total_tokens": booking.total_tokens
-        }
-        await send_booking_confirmation_email(current_user.email, booking_details)
-        await send_booking_confirmation_email(provider.email, booking_details)
-    except Exception as e:
-        print(f"Failed to send confirmation emails: {e}")
+    # Send confirmation emails after the response so the mail provider isn't on the request path
+    booking_details = {
+        "booking_id": booking.id,
+        "start_time": booking.start_time.strftime("%Y-%m-%d %H:%M"),
+        "duration_hours": booking.duration_hours,
+        "total_tokens": booking.total_tokens
+    }
+    background_tasks.add_task(
+        send_booking_confirmations, [current_user.email, provider["email"]], booking_details
+    )
     
     # Send WebSocket notifications
     try:
@@ -189,23 +295,10 @@ async def create_booking(
             "total_tokens": booking.total_tokens
         }
         await notify_booking_update(current_user.id, request.provider_id, booking_data)
-    except Exception as e:
-        print(f"Failed to send WebSocket notifications: {e}")
-    
-    return BookingResponse(
-        id=booking.id,
-        provider_id=booking.provider_id,
-        provider_name=profile.name or "Provider",
-        seeker_id=booking.seeker_id,
-        start_time=booking.start_time.isoformat(),
-        duration_hours=booking.duration_hours,
-        total_tokens=booking.total_tokens,
-        booking_type=booking.booking_type,
-        status=booking.status,
-        location=booking.location,
-        special_requests=booking.special_requests,
-        created_at=booking.created_at.isoformat()
-    )
+    except Exception:
+        logger.exception("Failed to send WebSocket notifications")
+    
+    return to_booking_response(booking, provider["name"])
 
 @router.get("/my-bookings", response_model=List[BookingResponse])
 async def get_my_bookings(
@@ -215,37 +308,32 @@ async def get_my_bookings(
     db: Session = Depends(get_db)
 ):
     """Get user's bookings (as seeker or provider)"""
-    query = db.query(Booking).filter(
-        (Booking.seeker_id == current_user.id) | (Booking.provider_id == current_user.id)
-    )
-    
-    if status_filter:
-        query = query.filter(Booking.status == status_filter)
-    
-    bookings = query.order_by(Booking.created_at.desc()).limit(limit).all()
-    
-    booking_responses = []
-    for booking in bookings:
-        # Get provider profile
-        profile = db.query(Profile).filter(Profile.user_id == booking.provider_id).first()
-        provider_name = profile.name if profile and profile.name else "Provider"
-        
-        booking_responses.append(BookingResponse(
-            id=booking.id,
-            provider_id=booking.provider_id,
-            provider_name=provider_name,
-            seeker_id=booking.seeker_id,
-            start_time=booking.start_time.isoformat(),
-            duration_hours=booking.duration_hours,
-            total_tokens=booking.total_tokens,
-            booking_type=booking.booking_type if hasattr(booking, 'booking_type') and booking.booking_type else BookingType.OUTCALL,
-            status=booking.status,
-            location=booking.location,
-            special_requests=booking.special_requests,
-            created_at=booking.created_at.isoformat()
-        ))
-    
-    return booking_responses
+    # Query each side separately so both can walk their (user, created_at) index,
+    # then merge; an OR across the two columns falls back to a scan and sort.
+    # Each side is a subquery so its ORDER BY/LIMIT is parenthesized on every dialect
+    def side(user_column):
+        query = select(*BOOKING_RESPONSE_COLUMNS).where(user_column == current_user.id)
+        if status_filter:
+            query = query.where(Booking.status == status_filter)
+        return query.order_by(Booking.created_at.desc()).limit(limit).subquery()
+    
+    merged = aliased(Booking, union_all(
+        select(side(Booking.seeker_id)), select(side(Booking.provider_id))
+    ).subquery())
+    bookings = db.query(merged).options(
+        load_only(*(getattr(merged, column.key) for column in BOOKING_RESPONSE_COLUMNS))
+    ).order_by(merged.created_at.desc()).limit(limit).all()
+    
+    # Fetch provider names for the whole page in one query, selecting only the columns we need
+    provider_ids = {booking.provider_id for booking in bookings}
+    provider_names = dict(
+        db.query(Profile.user_id, Profile.name).filter(Profile.user_id.in_(provider_ids)).all()
+    ) if provider_ids else {}
+    
+    return [
+        to_booking_response(booking, provider_names.get(booking.provider_id))
+        for booking in bookings
+    ]
 
 @router.get("/{booking_id}", response_model=BookingResponse)
 async def get_booking_details(
@@ -263,31 +351,19 @@ async def get_booking_details(
         )
     
     # Check access permissions
-    if (current_user.id not in [booking.seeker_id, booking.provider_id] and
-        current_user.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN, UserRole.MANAGER, UserRole.EMPLOYEE]):
+    is_party = current_user.id in (booking.seeker_id, booking.provider_id)
+    if not is_party and current_user.role not in STAFF_ROLES:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
         )
     
-    # Get provider profile
-    profile = db.query(Profile).filter(Profile.user_id == booking.provider_id).first()
-    provider_name = profile.name if profile and profile.name else "Provider"
-    
-    return BookingResponse(
-        id=booking.id,
-        provider_id=booking.provider_id,
-        provider_name=provider_name,
-        seeker_id=booking.seeker_id,
-        start_time=booking.start_time.isoformat(),
-        duration_hours=booking.duration_hours,
-        total_tokens=booking.total_tokens,
-        booking_type=booking.booking_type if hasattr(booking, 'booking_type') and booking.booking_type else BookingType.OUTCALL,
-        status=booking.status,
-        location=booking.location,
-        special_requests=booking.special_requests,
-        created_at=booking.created_at.isoformat()
-    )
+    if not is_party:
+        return to_booking_response(booking, None)
+    
+    provider = await asyncio.to_thread(get_provider_summary, db, booking.provider_id)
+    
+    return to_booking_response(booking, provider["name"] if provider else None)
 
 @router.put("/{booking_id}/status")
 async def update_booking_status(
@@ -297,7 +373,8 @@ async def update_booking_status(
     db: Session = Depends(get_db)
 ):
     """Update booking status"""
-    booking = db.query(Booking).filter(Booking.id == booking_id).first()
+    # Lock the row so two requests can't both see the old status and release escrow twice
+    booking = lock_booking(db, booking_id)
     
     if not booking:
         raise HTTPException(
@@ -357,15 +434,12 @@ async def update_booking_status(
     
     # Handle escrow release for completed bookings
     if request.status == BookingStatus.COMPLETED and old_status != BookingStatus.COMPLETED:
-        seeker_wallet = db.query(Token).filter(Token.user_id == booking.seeker_id).first()
-        provider_wallet = db.query(Token).filter(Token.user_id == booking.provider_id).first()
-        
         # Get provider profile to determine base rate
-        provider_profile = db.query(Profile).filter(Profile.user_id == booking.provider_id).first()
-        if provider_profile and provider_profile.hourly_rate:
+        provider = await asyncio.to_thread(get_provider_summary, db, booking.provider_id)
+        if provider and provider["hourly_rate"]:
             # Calculate earnings using PricingService
             cost_breakdown = PricingService.calculate_booking_cost(
-                db, provider_profile.hourly_rate, booking.provider_id, booking.duration_hours
+                db, provider["hourly_rate"], booking.provider_id, booking.duration_hours
             )
             provider_earnings = cost_breakdown["provider_earnings"]
         else:
@@ -374,8 +448,17 @@ async def update_booking_status(
             provider_earnings = booking.total_tokens - platform_commission
         
         # Release escrow to provider
-        seeker_wallet.escrow_balance -= booking.total_tokens
-        provider_wallet.balance += provider_earnings
+        wallets = release_escrow(
+            db, booking.seeker_id, booking.provider_id, booking.total_tokens, provider_earnings
+        )
+        seeker_wallet = wallets.get(booking.seeker_id)
+        provider_wallet = wallets.get(booking.provider_id)
+        if seeker_wallet is None or provider_wallet is None:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Wallet not found"
+            )
         
         # Create transactions
         escrow_release = TokenTransaction(
@@ -407,11 +490,16 @@ async def update_booking_status(
     
     # Handle refund for cancelled bookings
     elif request.status == BookingStatus.CANCELLED and old_status in [BookingStatus.PENDING, BookingStatus.CONFIRMED]:
-        seeker_wallet = db.query(Token).filter(Token.user_id == booking.seeker_id).first()
-        
         # Return tokens from escrow to seeker
-        seeker_wallet.escrow_balance -= booking.total_tokens
-        seeker_wallet.balance += booking.total_tokens
+        seeker_wallet = adjust_wallet(
+            db, booking.seeker_id, balance_delta=booking.total_tokens, escrow_delta=-booking.total_tokens
+        )
+        if seeker_wallet is None:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Wallet not found"
+            )
         
         refund_transaction = TokenTransaction(
             user_id=booking.seeker_id,
@@ -461,17 +549,40 @@ async def cancel_booking(
         )
     
     # Check cancellation policy (24 hours before start time)
-    if booking.start_time - datetime.utcnow() < timedelta(hours=24):
+    if as_utc(booking.start_time) - datetime.now(timezone.utc) < timedelta(hours=24):
         # Apply cancellation fee
-        cancellation_fee = int(booking.total_tokens * 0.1)  # 10% fee
+        cancellation_fee = booking.total_tokens * 10 // 100  # 10% fee, integer tokens
         refund_amount = booking.total_tokens - cancellation_fee
     else:
         refund_amount = booking.total_tokens
     
+    # Claim the cancellation only if the booking is still cancellable, so concurrent
+    # cancel requests can't both refund
+    cancelled = db.execute(
+        update(Booking)
+        .where(
+            Booking.id == booking.id,
+            Booking.status.in_([BookingStatus.PENDING, BookingStatus.CONFIRMED])
+        )
+        .values(status=BookingStatus.CANCELLED)
+        .returning(Booking.id)
+    ).first()
+    if cancelled is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Booking cannot be cancelled"
+        )
+    
     # Process refund
-    seeker_wallet = db.query(Token).filter(Token.user_id == booking.seeker_id).first()
-    seeker_wallet.escrow_balance -= booking.total_tokens
-    seeker_wallet.balance += refund_amount
+    seeker_wallet = adjust_wallet(
+        db, booking.seeker_id, balance_delta=refund_amount, escrow_delta=-booking.total_tokens
+    )
+    if seeker_wallet is None:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Wallet not found"
+        )
     
     refund_transaction = TokenTransaction(
         user_id=booking.seeker_id,
@@ -486,8 +597,6 @@ async def cancel_booking(
     )
     
     db.add(refund_transaction)
-    
-    booking.status = BookingStatus.CANCELLED
     db.commit()
     
     return {
@@ -534,8 +643,8 @@ async def generate_start_service_otp(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
-    except Exception as e:
-        print(f"Error generating OTP: {e}")
+    except Exception:
+        logger.exception("Error generating OTP")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to generate OTP"
@@ -578,8 +687,8 @@ async def get_seeker_start_service_otp(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
-    except Exception as e:
-        print(f"Error generating seeker OTP: {e}")
+    except Exception:
+        logger.exception("Error generating seeker OTP")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to generate OTP"
@@ -1,15 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import insert, tuple_
+from typing import List, Dict, Any, Optional, Tuple
 from app.core.deps import get_db, get_current_active_user, get_admin_user
 from app.models.user import User, UserRole
 from app.models.chat import ChatTemplate, ChatMessage, TemplateCategory
 from app.models.booking import Booking
-from pydantic import BaseModel
+from app.services.cache import cache_get_or_set, cache_delete
+from pydantic import BaseModel, field_validator
+from datetime import datetime
+import base64
+import orjson
 import re
+from functools import lru_cache
 
 router = APIRouter()
 
+# Roles that can use admin-only templates, and those that can read any booking's chat
+ADMIN_ROLES = frozenset({UserRole.ADMIN, UserRole.SUPER_ADMIN, UserRole.MANAGER})
+STAFF_ROLES = ADMIN_ROLES | {UserRole.EMPLOYEE}
+
+# Template variable placeholders look like [variable_name]
+TEMPLATE_VARIABLE_RE = re.compile(r'\[(\w+)\]')
+
+# Rows fetched per round-trip, and messages per chunk, when streaming a chat history
+CHAT_HISTORY_BATCH_SIZE = 500
+
+# Template lists are read on every chat screen and only change through the admin endpoints below
+TEMPLATE_LIST_CACHE_TTL = 300
+
+def template_list_cache_key(category: Optional[TemplateCategory], include_admin_only: bool) -> str:
+    """Cache key for one category (or all) of the template picker, per visibility tier"""
+    return f"v1:chat_templates:{category.value if category else 'all'}:{'admin' if include_admin_only else 'user'}"
+
+def invalidate_template_list_cache():
+    """Drop every cached template list; there is one per category and tier"""
+    cache_delete(*[
+        template_list_cache_key(category, include_admin_only)
+        for category in [None, *TemplateCategory]
+        for include_admin_only in (True, False)
+    ])
+
 class TemplateCreateRequest(BaseModel):
     category: TemplateCategory
     template_text: str
@@ -24,6 +56,14 @@ class TemplateResponse(BaseModel):
     active: bool
     admin_only: bool
     usage_count: int
+    
+    class Config:
+        from_attributes = True
+    
+    @field_validator("variables", mode="before")
+    @classmethod
+    def default_variables(cls, value):
+        return value or []
 
 class SendMessageRequest(BaseModel):
     template_id: int
@@ -39,57 +79,59 @@ class ChatMessageResponse(BaseModel):
     created_at: str
     is_flagged: bool
 
-def process_template_message(template_text: str, variables: Dict[str, str]) -> str:
-    """Process template by replacing variables with values"""
-    processed = template_text
-    for var_name, var_value in variables.items():
-        placeholder = f"[{var_name}]"
-        processed = processed.replace(placeholder, var_value)
-    return processed
+@lru_cache(maxsize=2048)
+def compile_template(template_text: str) -> Tuple[Optional[re.Pattern], Tuple[str, ...]]:
+    """
+    Placeholder names used by a template and a pattern matching exactly those placeholders.
+    Memoized by template text, so an edited template just gets a new entry.
+    """
+    names = tuple(dict.fromkeys(TEMPLATE_VARIABLE_RE.findall(template_text)))
+    if not names:
+        return None, names
+    return re.compile(r'\[(' + '|'.join(map(re.escape, names)) + r')\]'), names
 
-def validate_template_variables(template_text: str, provided_variables: Dict[str, str]) -> bool:
-    """Validate that all required variables are provided"""
-    # Find all variables in template (format: [variable_name])
-    required_vars = re.findall(r'\[(\w+)\]', template_text)
-    
-    for var in required_vars:
-        if var not in provided_variables:
-            return False
-    return True
+def process_template_message(template_text: str, variables: Dict[str, str]) -> Tuple[str, List[str]]:
+    """
+    Process template by replacing variables with values in a single pass.
+    Returns the processed message and the names of any variables that weren't provided.
+    """
+    pattern, names = compile_template(template_text)
+    if pattern is None:
+        return template_text, []
+    
+    missing = [name for name in names if name not in variables]
+    processed = pattern.sub(lambda match: variables.get(match.group(1), match.group(0)), template_text)
+    return processed, missing
 
 @router.get("/templates", response_model=List[TemplateResponse])
-async def get_chat_templates(
+def get_chat_templates(
     category: TemplateCategory = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get available chat templates"""
-    query = db.query(ChatTemplate).filter(ChatTemplate.active == True)
-    
-    if category:
-        query = query.filter(ChatTemplate.category == category)
-    
-    # Filter admin-only templates
-    if current_user.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN, UserRole.MANAGER]:
-        query = query.filter(ChatTemplate.admin_only == False)
-    
-    templates = query.order_by(ChatTemplate.usage_count.desc()).all()
-    
-    return [
-        TemplateResponse(
-            id=t.id,
-            category=t.category,
-            template_text=t.template_text,
-            variables=t.variables or [],
-            active=t.active,
-            admin_only=t.admin_only,
-            usage_count=t.usage_count
-        )
-        for t in templates
-    ]
+    include_admin_only = current_user.role in ADMIN_ROLES
+    
+    def load_templates() -> List[dict]:
+        query = db.query(ChatTemplate).filter(ChatTemplate.active == True)
+        
+        if category:
+            query = query.filter(ChatTemplate.category == category)
+        
+        # Filter admin-only templates
+        if not include_admin_only:
+            query = query.filter(ChatTemplate.admin_only == False)
+        
+        templates = query.order_by(ChatTemplate.usage_count.desc()).all()
+        
+        return [TemplateResponse.model_validate(t).model_dump(mode="json") for t in templates]
+    
+    return cache_get_or_set(
+        template_list_cache_key(category, include_admin_only), TEMPLATE_LIST_CACHE_TTL, load_templates
+    )
 
 @router.post("/templates", response_model=TemplateResponse)
-async def create_chat_template(
+def create_chat_template(
     request: TemplateCreateRequest,
     current_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
@@ -106,19 +148,12 @@ async def create_chat_template(
     db.add(template)
     db.commit()
     db.refresh(template)
+    invalidate_template_list_cache()
     
-    return TemplateResponse(
-        id=template.id,
-        category=template.category,
-        template_text=template.template_text,
-        variables=template.variables or [],
-        active=template.active,
-        admin_only=template.admin_only,
-        usage_count=template.usage_count
-    )
+    return TemplateResponse.model_validate(template)
 
 @router.put("/templates/{template_id}")
-async def update_chat_template(
+def update_chat_template(
     template_id: int,
     request: TemplateCreateRequest,
     current_user: User = Depends(get_admin_user),
@@ -138,11 +173,12 @@ async def update_chat_template(
     template.admin_only = request.admin_only
     
     db.commit()
+    invalidate_template_list_cache()
     
     return {"success": True, "message": "Template updated successfully"}
 
 @router.delete("/templates/{template_id}")
-async def delete_chat_template(
+def delete_chat_template(
     template_id: int,
     current_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
@@ -157,18 +193,19 @@ async def delete_chat_template(
     
     template.active = False
     db.commit()
+    invalidate_template_list_cache()
     
     return {"success": True, "message": "Template deactivated successfully"}
 
-@router.get("/{booking_id}/messages", response_model=List[ChatMessageResponse])
-async def get_chat_messages(
+@router.get("/{booking_id}/messages", response_model=None, responses={200: {"model": List[ChatMessageResponse]}})
+def get_chat_messages(
     booking_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get chat messages for a booking"""
     # Verify user has access to this booking
-    booking = db.query(Booking).filter(Booking.id == booking_id).first()
+    booking = db.query(Booking.seeker_id, Booking.provider_id).filter(Booking.id == booking_id).first()
     if not booking:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -176,38 +213,53 @@ async def get_chat_messages(
         )
     
     # Check if user is part of this booking or an admin/employee
-    if (current_user.id not in [booking.seeker_id, booking.provider_id] and 
-        current_user.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN, UserRole.MANAGER, UserRole.EMPLOYEE]):
+    if (current_user.id not in (booking.seeker_id, booking.provider_id) and 
+        current_user.role not in STAFF_ROLES):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
         )
     
-    messages = db.query(ChatMessage).filter(
+    # Load senders, their profiles and templates with the messages in one query,
+    # fetching rows from the cursor in batches rather than all at once
+    messages = db.query(ChatMessage).options(
+        joinedload(ChatMessage.sender).joinedload(User.profile),
+        joinedload(ChatMessage.template)
+    ).filter(
         ChatMessage.booking_id == booking_id
-    ).order_by(ChatMessage.created_at.asc()).all()
-    
-    response_messages = []
-    for msg in messages:
-        # Get sender info
-        sender = db.query(User).filter(User.id == msg.sender_id).first()
-        template = db.query(ChatTemplate).filter(ChatTemplate.id == msg.template_id).first()
-        
-        response_messages.append(ChatMessageResponse(
-            id=msg.id,
-            sender_id=msg.sender_id,
-            sender_name=sender.profile.name if sender.profile and sender.profile.name else sender.email,
-            template_id=msg.template_id,
-            template_text=template.template_text if template else "",
-            processed_message=msg.processed_message,
-            created_at=msg.created_at.isoformat(),
-            is_flagged=msg.is_flagged
-        ))
-    
-    return response_messages
+    ).order_by(ChatMessage.created_at.asc()).yield_per(CHAT_HISTORY_BATCH_SIZE)
+    
+    def stream_messages():
+        # Emit a JSON array one batch at a time so long histories are never held in memory
+        yield b"["
+        batch = []
+        for index, msg in enumerate(messages):
+            sender = msg.sender
+            template = msg.template
+            
+            if index:
+                batch.append(b",")
+            batch.append(orjson.dumps(ChatMessageResponse(
+                id=msg.id,
+                sender_id=msg.sender_id,
+                sender_name=sender.profile.name if sender.profile and sender.profile.name else sender.email,
+                template_id=msg.template_id,
+                template_text=template.template_text if template else "",
+                processed_message=msg.processed_message,
+                created_at=msg.created_at.isoformat(),
+                is_flagged=msg.is_flagged
+            ).model_dump()))
+            
+            if len(batch) >= CHAT_HISTORY_BATCH_SIZE:
+                yield b"".join(batch)
+                batch = []
+        batch.append(b"]")
+        yield b"".join(batch)
+    
+    return StreamingResponse(stream_messages(), media_type="application/json")
 
 @router.post("/{booking_id}/send", response_model=ChatMessageResponse)
-async def send_chat_message(
+def send_chat_message(
     booking_id: int,
     request: SendMessageRequest,
     current_user: User = Depends(get_current_active_user),
@@ -215,14 +267,14 @@ async def send_chat_message(
 ):
     """Send a template-based chat message"""
     # Verify booking exists and user has access
-    booking = db.query(Booking).filter(Booking.id == booking_id).first()
+    booking = db.query(Booking.seeker_id, Booking.provider_id).filter(Booking.id == booking_id).first()
     if not booking:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Booking not found"
         )
     
-    if current_user.id not in [booking.seeker_id, booking.provider_id]:
+    if current_user.id not in (booking.seeker_id, booking.provider_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
@@ -242,38 +294,39 @@ async def send_chat_message(
     
     # Check admin-only templates
     if (template.admin_only and 
-        current_user.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN, UserRole.MANAGER]):
+        current_user.role not in ADMIN_ROLES):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Template requires admin privileges"
         )
     
-    # Validate variables
-    if not validate_template_variables(template.template_text, request.variables):
+    # Process message, validating variables in the same pass
+    processed_message, missing_variables = process_template_message(template.template_text, request.variables)
+    if missing_variables:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Missing required template variables"
+            detail=f"Missing required template variables: {', '.join(missing_variables)}"
         )
     
-    # Process message
-    processed_message = process_template_message(template.template_text, request.variables)
+    # Create chat message, getting its id and timestamp back from the INSERT itself
+    chat_message = db.execute(
+        insert(ChatMessage).values(
+            booking_id=booking_id,
+            sender_id=current_user.id,
+            template_id=template.id,
+            template_variables=request.variables,
+            processed_message=processed_message
+        ).returning(ChatMessage.id, ChatMessage.created_at)
+    ).first()
     
-    # Create chat message
-    chat_message = ChatMessage(
-        booking_id=booking_id,
-        sender_id=current_user.id,
-        template_id=template.id,
-        template_variables=request.variables,
-        processed_message=processed_message
+    # Increment usage in the database so concurrent sends don't overwrite each other's count
+    db.query(ChatTemplate).filter(ChatTemplate.id == template.id).update(
+        {ChatTemplate.usage_count: ChatTemplate.usage_count + 1}, synchronize_session=False
     )
-    
-    db.add(chat_message)
-    
-    # Update template usage count
-    template.usage_count += 1
+    template_id = template.id
+    template_text = template.template_text
     
     db.commit()
-    db.refresh(chat_message)
     
     # Get sender info for response
     sender_name = current_user.profile.name if current_user.profile and current_user.profile.name else current_user.email
@@ -282,15 +335,15 @@ async def send_chat_message(
         id=chat_message.id,
         sender_id=current_user.id,
         sender_name=sender_name,
-        template_id=template.id,
-        template_text=template.template_text,
+        template_id=template_id,
+        template_text=template_text,
         processed_message=processed_message,
         created_at=chat_message.created_at.isoformat(),
         is_flagged=False
     )
 
 @router.post("/messages/{message_id}/flag")
-async def flag_message(
+def flag_message(
     message_id: int,
     reason: str,
     current_user: User = Depends(get_current_active_user),
@@ -305,8 +358,8 @@ async def flag_message(
         )
     
     # Verify user has access to this booking
-    booking = db.query(Booking).filter(Booking.id == message.booking_id).first()
-    if current_user.id not in [booking.seeker_id, booking.provider_id]:
+    booking = db.query(Booking.seeker_id, Booking.provider_id).filter(Booking.id == message.booking_id).first()
+    if current_user.id not in (booking.seeker_id, booking.provider_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
@@ -318,21 +371,59 @@ async def flag_message(
     
     return {"success": True, "message": "Message flagged for admin review"}
 
-@router.get("/flagged-messages")
-async def get_flagged_messages(
+def encode_flagged_cursor(message: ChatMessage) -> str:
+    """Opaque keyset cursor pointing just past the given message"""
+    raw = f"{message.created_at.isoformat()},{message.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_flagged_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_flagged_cursor"""
+    try:
+        created_at, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit(",", 1)
+        return datetime.fromisoformat(created_at), int(message_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+@router.get("/flagged-messages", response_class=ORJSONResponse)
+def get_flagged_messages(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
     current_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Get all flagged messages for admin review"""
-    flagged_messages = db.query(ChatMessage).filter(
+    """Get flagged messages for admin review, newest first, one page at a time"""
+    # Many-to-one joins, so each flagged message is still a single row
+    query = db.query(ChatMessage).options(
+        joinedload(ChatMessage.sender),
+        joinedload(ChatMessage.booking),
+        joinedload(ChatMessage.template)
+    ).filter(
         ChatMessage.is_flagged == True
-    ).order_by(ChatMessage.created_at.desc()).all()
+    )
+    
+    # Keyset pagination: continue strictly after the last message of the previous page
+    if cursor:
+        cursor_created_at, cursor_id = decode_flagged_cursor(cursor)
+        query = query.filter(
+            tuple_(ChatMessage.created_at, ChatMessage.id) < tuple_(cursor_created_at, cursor_id)
+        )
+    
+    flagged_messages = query.order_by(
+        ChatMessage.created_at.desc(), ChatMessage.id.desc()
+    ).limit(limit + 1).all()
+    
+    has_more = len(flagged_messages) > limit
+    flagged_messages = flagged_messages[:limit]
+    next_cursor = encode_flagged_cursor(flagged_messages[-1]) if has_more else None
     
     response = []
     for msg in flagged_messages:
-        sender = db.query(User).filter(User.id == msg.sender_id).first()
-        booking = db.query(Booking).filter(Booking.id == msg.booking_id).first()
-        template = db.query(ChatTemplate).filter(ChatTemplate.id == msg.template_id).first()
+        sender = msg.sender
+        booking = msg.booking
+        template = msg.template
         
         response.append({
             "message_id": msg.id,
@@ -349,4 +440,4 @@ async def get_flagged_messages(
             }
         })
     
-    return {"flagged_messages": response}
\ No newline at end of file
+    return {"flagged_messages": response, "next_cursor": next_cursor}
\ No newline at end of file
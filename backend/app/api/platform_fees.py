@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, update
 from typing import List, Optional
 from datetime import datetime
 from app.core.deps import get_db, require_role
@@ -9,19 +11,26 @@ from app.models.platform_fee import (
     FeeChangeRequestStatus, FeeChangeRequestType
 )
 from app.services.pricing import PricingService
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
 
 router = APIRouter()
 
 class FeeConfigResponse(BaseModel):
     id: int
     provider_id: Optional[int]
-    provider_email: Optional[str]
+    provider_email: Optional[str] = None
     fee_percentage: float
-    fee_percentage_display: int  # 30 for 30%
     is_active: bool
     created_by: int
-    created_at: str
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+    
+    @computed_field
+    @property
+    def fee_percentage_display(self) -> int:  # 30 for 30%
+        return int(self.fee_percentage * 100)
 
 class FeeChangeRequestCreate(BaseModel):
     request_type: FeeChangeRequestType
@@ -62,7 +71,7 @@ class FeeChangeLogResponse(BaseModel):
     created_at: str
 
 @router.get("/configs", response_model=List[FeeConfigResponse])
-async def get_fee_configs(
+def get_fee_configs(
     current_user: User = Depends(require_role([UserRole.MANAGER, UserRole.ADMIN, UserRole.SUPER_ADMIN])),
     active_only: bool = Query(True),
     db: Session = Depends(get_db)
@@ -75,28 +84,23 @@ async def get_fee_configs(
     
     configs = query.order_by(PlatformFeeConfig.created_at.desc()).all()
     
+    # Look up provider emails for all configs at once, selecting only the column we need
+    provider_ids = {config.provider_id for config in configs if config.provider_id}
+    provider_emails = dict(
+        db.query(User.id, User.email).filter(User.id.in_(provider_ids)).all()
+    ) if provider_ids else {}
+    
     result = []
     for config in configs:
-        provider_email = None
+        response = FeeConfigResponse.model_validate(config)
         if config.provider_id:
-            provider = db.query(User).filter(User.id == config.provider_id).first()
-            provider_email = provider.email if provider else "Unknown"
-        
-        result.append(FeeConfigResponse(
-            id=config.id,
-            provider_id=config.provider_id,
-            provider_email=provider_email,
-            fee_percentage=config.fee_percentage,
-            fee_percentage_display=int(config.fee_percentage * 100),
-            is_active=config.is_active,
-            created_by=config.created_by,
-            created_at=config.created_at.isoformat()
-        ))
+            response.provider_email = provider_emails.get(config.provider_id, "Unknown")
+        result.append(response)
     
     return result
 
 @router.post("/set-global-fee")
-async def set_global_platform_fee(
+def set_global_platform_fee(
     fee_percentage: float,
     current_user: User = Depends(require_role([UserRole.SUPER_ADMIN])),
     db: Session = Depends(get_db)
@@ -109,12 +113,7 @@ async def set_global_platform_fee(
         )
     
     # Get current global fee for logging
-    current_config = db.query(PlatformFeeConfig).filter(
-        PlatformFeeConfig.provider_id.is_(None),
-        PlatformFeeConfig.is_active == True
-    ).first()
-    
-    old_fee = current_config.fee_percentage if current_config else 0.15
+    old_fee = PricingService.get_platform_fee_percentage(db)
     
     # Set new fee
     new_config = PricingService.set_platform_fee(db, current_user.id, fee_percentage)
@@ -138,7 +137,7 @@ async def set_global_platform_fee(
     }
 
 @router.post("/set-provider-fee/{provider_id}")
-async def set_provider_platform_fee(
+def set_provider_platform_fee(
     provider_id: int,
     fee_percentage: float,
     current_user: User = Depends(require_role([UserRole.SUPER_ADMIN])),
@@ -189,7 +188,7 @@ async def set_provider_platform_fee(
     }
 
 @router.post("/request-change", response_model=FeeChangeRequestResponse)
-async def create_fee_change_request(
+def create_fee_change_request(
     request: FeeChangeRequestCreate,
     current_user: User = Depends(require_role([UserRole.EMPLOYEE, UserRole.MANAGER])),
     db: Session = Depends(get_db)
@@ -250,14 +249,18 @@ async def create_fee_change_request(
         created_at=fee_request.created_at.isoformat()
     )
 
-@router.get("/requests", response_model=List[FeeChangeRequestResponse])
-async def get_fee_change_requests(
+@router.get("/requests", response_model=List[FeeChangeRequestResponse], response_class=ORJSONResponse)
+def get_fee_change_requests(
     current_user: User = Depends(require_role([UserRole.MANAGER, UserRole.ADMIN, UserRole.SUPER_ADMIN])),
     status_filter: Optional[FeeChangeRequestStatus] = Query(None),
     db: Session = Depends(get_db)
 ):
     """Get fee change requests"""
-    query = db.query(FeeChangeRequest)
+    query = db.query(FeeChangeRequest).options(
+        joinedload(FeeChangeRequest.requester),
+        joinedload(FeeChangeRequest.provider),
+        joinedload(FeeChangeRequest.reviewer)
+    )
     
     if status_filter:
         query = query.filter(FeeChangeRequest.status == status_filter)
@@ -266,18 +269,9 @@ async def get_fee_change_requests(
     
     result = []
     for req in requests:
-        # Get requester info
-        requester = db.query(User).filter(User.id == req.requested_by).first()
-        
-        # Get provider info if applicable
-        provider = None
-        if req.provider_id:
-            provider = db.query(User).filter(User.id == req.provider_id).first()
-        
-        # Get reviewer info if applicable
-        reviewer = None
-        if req.reviewed_by:
-            reviewer = db.query(User).filter(User.id == req.reviewed_by).first()
+        requester = req.requester
+        provider = req.provider
+        reviewer = req.reviewer
         
         result.append(FeeChangeRequestResponse(
             id=req.id,
@@ -300,79 +294,94 @@ async def get_fee_change_requests(
     return result
 
 @router.put("/requests/{request_id}/review")
-async def review_fee_change_request(
+def review_fee_change_request(
     request_id: int,
     approval: FeeChangeApproval,
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN])),
     db: Session = Depends(get_db)
 ):
     """Review and approve/reject fee change request"""
-    fee_request = db.query(FeeChangeRequest).filter(FeeChangeRequest.id == request_id).first()
-    
-    if not fee_request:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Fee change request not found"
+    new_status = FeeChangeRequestStatus.APPROVED if approval.approved else FeeChangeRequestStatus.REJECTED
+    
+    # Claim the request in one statement; only a still-pending request matches,
+    # so two reviewers can't both apply it
+    fee_request = db.execute(
+        update(FeeChangeRequest)
+        .where(
+            FeeChangeRequest.id == request_id,
+            FeeChangeRequest.status == FeeChangeRequestStatus.PENDING
         )
+        .values(
+            status=new_status,
+            reviewed_by=current_user.id,
+            review_notes=approval.review_notes,
+            reviewed_at=func.now()
+        )
+        .returning(FeeChangeRequest.provider_id, FeeChangeRequest.requested_fee_percentage)
+    ).first()
     
-    if fee_request.status != FeeChangeRequestStatus.PENDING:
+    if not fee_request:
+        exists = db.query(FeeChangeRequest.id).filter(FeeChangeRequest.id == request_id).first()
+        db.rollback()
+        if not exists:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Fee change request not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Request has already been reviewed"
         )
     
-    # Update request status
-    fee_request.status = FeeChangeRequestStatus.APPROVED if approval.approved else FeeChangeRequestStatus.REJECTED
-    fee_request.reviewed_by = current_user.id
-    fee_request.review_notes = approval.review_notes
-    fee_request.reviewed_at = datetime.utcnow()
-    
     # If approved, implement the change
     if approval.approved:
         old_fee = PricingService.get_platform_fee_percentage(db, fee_request.provider_id)
         
-        # Set new fee
-        PricingService.set_platform_fee(
-            db, 
-            current_user.id, 
-            fee_request.requested_fee_percentage, 
-            fee_request.provider_id
-        )
-        
         # Log the change
         provider_info = ""
         if fee_request.provider_id:
-            provider = db.query(User).filter(User.id == fee_request.provider_id).first()
+            provider = db.query(User.email).filter(User.id == fee_request.provider_id).first()
             provider_info = f" for provider {provider.email}" if provider else ""
         
         log_entry = FeeChangeLog(
             provider_id=fee_request.provider_id,
             old_fee_percentage=old_fee,
             new_fee_percentage=fee_request.requested_fee_percentage,
-            change_reason=f"Approved fee change request #{fee_request.id}{provider_info}",
+            change_reason=f"Approved fee change request #{request_id}{provider_info}",
             changed_by=current_user.id,
-            request_id=fee_request.id
+            request_id=request_id
         )
         db.add(log_entry)
-    
-    db.commit()
+        
+        # Set new fee; this commits, so the review, log entry and new config land together
+        PricingService.set_platform_fee(
+            db, 
+            current_user.id, 
+            fee_request.requested_fee_percentage, 
+            fee_request.provider_id
+        )
+    else:
+        db.commit()
     
     return {
         "success": True,
         "message": f"Request {'approved' if approval.approved else 'rejected'} successfully",
         "request_id": request_id,
-        "status": fee_request.status
+        "status": new_status
     }
 
-@router.get("/changelog", response_model=List[FeeChangeLogResponse])
-async def get_fee_change_log(
+@router.get("/changelog", response_model=List[FeeChangeLogResponse], response_class=ORJSONResponse)
+def get_fee_change_log(
     current_user: User = Depends(require_role([UserRole.MANAGER, UserRole.ADMIN, UserRole.SUPER_ADMIN])),
     provider_id: Optional[int] = Query(None),
     limit: int = Query(50, le=100),
     db: Session = Depends(get_db)
 ):
     """Get fee change history/changelog"""
-    query = db.query(FeeChangeLog)
+    query = db.query(FeeChangeLog).options(
+        joinedload(FeeChangeLog.changer),
+        joinedload(FeeChangeLog.provider)
+    )
     
     if provider_id:
         query = query.filter(FeeChangeLog.provider_id == provider_id)
@@ -381,13 +390,8 @@ async def get_fee_change_log(
     
     result = []
     for log in logs:
-        # Get changer info
-        changer = db.query(User).filter(User.id == log.changed_by).first()
-        
-        # Get provider info if applicable
-        provider = None
-        if log.provider_id:
-            provider = db.query(User).filter(User.id == log.provider_id).first()
+        changer = log.changer
+        provider = log.provider
         
         result.append(FeeChangeLogResponse(
             id=log.id,
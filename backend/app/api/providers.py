@@ -1,17 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func
 from typing import List, Optional
+from app.core.config import settings
 from app.core.deps import get_db, get_current_active_user, require_role
 from app.models.user import User, UserRole
 from app.models.profile import Profile, ProfileVerificationStatus
 from app.models.rating import Rating
 from app.services.pricing import PricingService
+from app.services.cache import (
+    cache_get_or_set, invalidate_provider, provider_search_cache_key, provider_view_cache_key
+)
 from pydantic import BaseModel
 from datetime import datetime, time
 import json
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Search results tolerate brief staleness; profile and fee changes bump the cache generation
+PROVIDER_SEARCH_CACHE_TTL = 60
+# A provider's own seeker view and pricing preview; profile writes drop them explicitly
+PROVIDER_VIEW_CACHE_TTL = 120
 
 class AvailabilitySlot(BaseModel):
     day: str  # monday, tuesday, etc.
@@ -55,8 +66,28 @@ class ProviderDetailResponse(ProviderResponse):
     availability: dict
     recent_reviews: List[dict]
 
-@router.get("/search", response_model=List[ProviderResponse])
-async def search_providers(
+def get_recent_reviews(db: Session, user_id: int, limit: int = 5) -> List[dict]:
+    """Newest reviews for a provider, joined to the reviewer's profile name in the same query"""
+    rows = db.query(
+        Rating.rating, Rating.review, Rating.is_anonymous, Rating.created_at,
+        Rating.provider_response, Profile.name.label("reviewer_name")
+    ).outerjoin(Profile, Profile.user_id == Rating.rated_by).filter(
+        Rating.rated_user == user_id
+    ).order_by(Rating.created_at.desc()).limit(limit).all()
+    
+    return [
+        {
+            "rating": row.rating,
+            "review": row.review,
+            "reviewer_name": "Anonymous" if row.is_anonymous else (row.reviewer_name or "User"),
+            "created_at": row.created_at,
+            "provider_response": row.provider_response
+        }
+        for row in rows
+    ]
+
+@router.get("/search", response_model=None, responses={200: {"model": List[ProviderResponse]}})
+def search_providers(
     location: Optional[str] = Query(None),
     min_rate: Optional[int] = Query(None),
     max_rate: Optional[int] = Query(None),
@@ -68,7 +99,40 @@ async def search_providers(
     db: Session = Depends(get_db)
 ):
     """Search for providers with filters"""
-    query = db.query(Profile).join(User).filter(
+    # available_today isn't applied yet, so it is left out of the cache key
+    filters = {
+        "location": location,
+        "min_rate": min_rate,
+        "max_rate": max_rate,
+        "services": services,
+        "languages": languages,
+        "page": page,
+        "limit": limit
+    }
+    # Results are built from trusted rows (or the cache), so skip response model validation
+    return ORJSONResponse(cache_get_or_set(
+        provider_search_cache_key(filters),
+        PROVIDER_SEARCH_CACHE_TTL,
+        lambda: [provider.model_dump(mode="json") for provider in find_providers(db, **filters)]
+    ))
+
+def find_providers(
+    db: Session,
+    location: Optional[str],
+    min_rate: Optional[int],
+    max_rate: Optional[int],
+    services: Optional[str],
+    languages: Optional[str],
+    page: int,
+    limit: int
+) -> List[ProviderResponse]:
+    """Run a provider search against the database"""
+    # Only the card columns, as plain rows rather than full Profile objects
+    query = db.query(
+        Profile.id, Profile.user_id, Profile.name, Profile.bio, Profile.hourly_rate, Profile.location,
+        Profile.images, Profile.services_offered, Profile.languages, Profile.verification_status,
+        Profile.rating_sum, Profile.total_ratings
+    ).join(User, User.id == Profile.user_id).filter(
         User.role == UserRole.PROVIDER,
         User.is_active == True,
         Profile.verification_status == ProfileVerificationStatus.APPROVED
@@ -76,7 +140,10 @@ async def search_providers(
     
     # Apply filters
     if location:
-        query = query.filter(Profile.location.ilike(f"%{location}%"))
+        # Escape LIKE wildcards so input like "%" can't turn into a match-everything scan;
+        # the pattern is served by the ix_profiles_location_trgm trigram index
+        pattern = location.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.filter(Profile.location.ilike(f"%{pattern}%", escape="\\"))
     
     if min_rate:
         query = query.filter(Profile.hourly_rate >= min_rate)
@@ -84,38 +151,37 @@ async def search_providers(
     if max_rate:
         query = query.filter(Profile.hourly_rate <= max_rate)
     
+    # One containment check per array so a single GIN lookup covers every requested value
     if services:
         service_list = [s.strip() for s in services.split(",")]
-        for service in service_list:
-            query = query.filter(Profile.services_offered.any(service))
+        query = query.filter(Profile.services_offered.contains(service_list))
     
     if languages:
         language_list = [l.strip() for l in languages.split(",")]
-        for language in language_list:
-            query = query.filter(Profile.languages.any(language))
+        query = query.filter(Profile.languages.contains(language_list))
     
     # Pagination
     offset = (page - 1) * limit
     profiles = query.offset(offset).limit(limit).all()
     
+    # Price the whole page with one fee lookup instead of one per provider
+    rates = PricingService.calculate_provider_rates_bulk(
+        db, [(profile.user_id, profile.hourly_rate) for profile in profiles if profile.hourly_rate]
+    )
+    
     providers = []
     for profile in profiles:
-        # Calculate average rating
-        ratings = db.query(Rating).filter(Rating.rated_user == profile.user_id).all()
-        avg_rating = sum(r.rating for r in ratings) / len(ratings) if ratings else 0
-        
         # Check if available today (simplified)
         is_available_now = True  # You can implement more complex availability logic
         
         # Calculate pricing with platform fee
         base_rate = profile.hourly_rate or 0
         if base_rate > 0:
-            pricing = PricingService.calculate_provider_rates(db, base_rate, profile.user_id)
-            seeker_rate = pricing["seeker_rate"]
+            seeker_rate = rates[profile.user_id]["seeker_rate"]
         else:
             seeker_rate = 0
         
-        providers.append(ProviderResponse(
+        providers.append(ProviderResponse.model_construct(
             id=profile.id,
             user_id=profile.user_id,
             name=profile.name or "Anonymous",
@@ -127,15 +193,15 @@ async def search_providers(
             services_offered=profile.services_offered or [],
             languages=profile.languages or [],
             verification_status=profile.verification_status,
-            avg_rating=round(avg_rating, 1),
-            total_ratings=len(ratings),
+            avg_rating=round(profile.rating_sum / profile.total_ratings, 1) if profile.total_ratings else 0.0,
+            total_ratings=profile.total_ratings,
             is_available_now=is_available_now
         ))
     
     return providers
 
 @router.get("/{provider_id}", response_model=ProviderDetailResponse)
-async def get_provider_details(
+def get_provider_details(
     provider_id: int,
     db: Session = Depends(get_db)
 ):
@@ -151,21 +217,8 @@ async def get_provider_details(
             detail="Provider not found"
         )
     
-    # Get ratings and reviews
-    ratings = db.query(Rating).filter(Rating.rated_user == profile.user_id).all()
-    avg_rating = sum(r.rating for r in ratings) / len(ratings) if ratings else 0
-    
     # Get recent reviews
-    recent_reviews = []
-    for rating in ratings[-5:]:  # Last 5 reviews
-        rater = db.query(User).filter(User.id == rating.rated_by).first()
-        recent_reviews.append({
-            "rating": rating.rating,
-            "review": rating.review,
-            "reviewer_name": "Anonymous" if rating.is_anonymous else (rater.profile.name if rater.profile else "User"),
-            "created_at": rating.created_at.isoformat(),
-            "provider_response": rating.provider_response
-        })
+    recent_reviews = get_recent_reviews(db, profile.user_id)
     
     # Calculate pricing with platform fee for detail view
     base_rate = profile.hourly_rate or 0
@@ -187,15 +240,15 @@ async def get_provider_details(
         services_offered=profile.services_offered or [],
         languages=profile.languages or [],
         verification_status=profile.verification_status,
-        avg_rating=round(avg_rating, 1),
-        total_ratings=len(ratings),
+        avg_rating=round(profile.avg_rating, 1),
+        total_ratings=profile.total_ratings,
         is_available_now=True,
         availability=profile.availability or {},
         recent_reviews=recent_reviews
     )
 
 @router.get("/my-profile")
-async def get_my_provider_profile(
+def get_my_provider_profile(
     current_user: User = Depends(require_role([UserRole.PROVIDER])),
     db: Session = Depends(get_db)
 ):
@@ -221,7 +274,7 @@ async def get_my_provider_profile(
     }
 
 @router.put("/my-profile")
-async def update_my_provider_profile(
+def update_my_provider_profile(
     request: ProfileUpdateRequest,
     current_user: User = Depends(require_role([UserRole.PROVIDER])),
     db: Session = Depends(get_db)
@@ -268,11 +321,12 @@ async def update_my_provider_profile(
         profile.verification_status = ProfileVerificationStatus.PENDING
     
     db.commit()
+    invalidate_provider(current_user.id)
     
     return {"success": True, "message": "Profile updated successfully"}
 
 @router.post("/my-profile/upload-image")
-async def upload_profile_image(
+def upload_profile_image(
     image_url: str,  # In production, handle file upload
     current_user: User = Depends(require_role([UserRole.PROVIDER])),
     db: Session = Depends(get_db)
@@ -299,11 +353,12 @@ async def upload_profile_image(
     profile.verification_status = ProfileVerificationStatus.PENDING  # Re-verify after image upload
     
     db.commit()
+    invalidate_provider(current_user.id)
     
     return {"success": True, "message": "Image uploaded successfully"}
 
 @router.delete("/my-profile/images/{image_index}")
-async def delete_profile_image(
+def delete_profile_image(
     image_index: int,
     current_user: User = Depends(require_role([UserRole.PROVIDER])),
     db: Session = Depends(get_db)
@@ -324,11 +379,12 @@ async def delete_profile_image(
     
     profile.images.pop(image_index)
     db.commit()
+    invalidate_provider(current_user.id)
     
     return {"success": True, "message": "Image deleted successfully"}
 
 @router.get("/my-earnings")
-async def get_provider_earnings(
+def get_provider_earnings(
     current_user: User = Depends(require_role([UserRole.PROVIDER])),
     db: Session = Depends(get_db)
 ):
@@ -336,20 +392,22 @@ async def get_provider_earnings(
     from app.models.booking import Booking, BookingStatus
     from app.models.token import TokenTransaction, TransactionType
     
-    # Get completed bookings
-    completed_bookings = db.query(Booking).filter(
+    completed_filter = (
         Booking.provider_id == current_user.id,
         Booking.status == BookingStatus.COMPLETED
-    ).all()
+    )
     
-    # Get earnings transactions
-    earnings = db.query(TokenTransaction).filter(
+    # Count and sum in the database rather than loading every booking and transaction
+    total_bookings = db.query(func.count(Booking.id)).filter(*completed_filter).scalar()
+    total_earnings = db.query(func.coalesce(func.sum(TokenTransaction.amount), 0)).filter(
         TokenTransaction.user_id == current_user.id,
         TokenTransaction.type == TransactionType.EARNING
-    ).all()
+    ).scalar()
+    
+    recent_bookings = db.query(
+        Booking.id, Booking.start_time, Booking.duration_hours, Booking.total_tokens, Booking.status
+    ).filter(*completed_filter).order_by(Booking.start_time.desc()).limit(10).all()
     
-    total_earnings = sum(t.amount for t in earnings)
-    total_bookings = len(completed_bookings)
     platform_commission = total_earnings * settings.PLATFORM_COMMISSION
     net_earnings = total_earnings - platform_commission
     
@@ -362,55 +420,58 @@ async def get_provider_earnings(
         "recent_bookings": [
             {
                 "id": booking.id,
-                "start_time": booking.start_time.isoformat(),
+                "start_time": booking.start_time,
                 "duration_hours": booking.duration_hours,
                 "total_tokens": booking.total_tokens,
                 "status": booking.status
             }
-            for booking in completed_bookings[-10:]  # Last 10 bookings
+            for booking in recent_bookings
         ]
     }
 
 @router.get("/my-profile/pricing-preview")
-async def get_pricing_preview(
+def get_pricing_preview(
     current_user: User = Depends(require_role([UserRole.PROVIDER])),
     db: Session = Depends(get_db)
 ):
     """Get pricing preview showing how listing appears to seekers"""
-    return PricingService.get_provider_preview_pricing(db, current_user.id)
+    return cache_get_or_set(
+        provider_view_cache_key(current_user.id, "pricing_preview"),
+        PROVIDER_VIEW_CACHE_TTL,
+        lambda: PricingService.get_provider_preview_pricing(db, current_user.id)
+    )
 
 @router.get("/my-profile/view-as-seeker")
-async def view_profile_as_seeker(
+def view_profile_as_seeker(
     current_user: User = Depends(require_role([UserRole.PROVIDER])),
     db: Session = Depends(get_db)
 ):
     """View your profile exactly as seekers see it, including pricing with platform fee"""
-    profile = db.query(Profile).filter(Profile.user_id == current_user.id).first()
-    if not profile:
+    seeker_view = cache_get_or_set(
+        provider_view_cache_key(current_user.id, "seeker_view"),
+        PROVIDER_VIEW_CACHE_TTL,
+        lambda: build_seeker_view(db, current_user.id)
+    )
+    if seeker_view is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Profile not found"
         )
     
-    # Get ratings and reviews
-    ratings = db.query(Rating).filter(Rating.rated_user == current_user.id).all()
-    avg_rating = sum(r.rating for r in ratings) / len(ratings) if ratings else 0
+    return seeker_view
+
+def build_seeker_view(db: Session, user_id: int) -> Optional[dict]:
+    """Build the seeker-facing view of a provider's profile, or None if they have no profile"""
+    profile = db.query(Profile).filter(Profile.user_id == user_id).first()
+    if not profile:
+        return None
     
     # Get recent reviews
-    recent_reviews = []
-    for rating in ratings[-5:]:  # Last 5 reviews
-        rater = db.query(User).filter(User.id == rating.rated_by).first()
-        recent_reviews.append({
-            "rating": rating.rating,
-            "review": rating.review,
-            "reviewer_name": "Anonymous" if rating.is_anonymous else (rater.profile.name if rater.profile else "User"),
-            "created_at": rating.created_at.isoformat(),
-            "provider_response": rating.provider_response
-        })
+    recent_reviews = get_recent_reviews(db, profile.user_id)
     
     # Calculate pricing as seekers see it
     base_rate = profile.hourly_rate or 0
-    pricing_info = PricingService.get_provider_preview_pricing(db, current_user.id)
+    pricing_info = PricingService.get_provider_preview_pricing(db, user_id)
     
     seeker_view = {
         "profile": {
@@ -423,8 +484,8 @@ async def view_profile_as_seeker(
             "services_offered": profile.services_offered or [],
             "languages": profile.languages or [],
             "verification_status": profile.verification_status,
-            "avg_rating": round(avg_rating, 1),
-            "total_ratings": len(ratings),
+            "avg_rating": round(profile.avg_rating, 1),
+            "total_ratings": profile.total_ratings,
             "is_available_now": True,
             "availability": profile.availability or {},
             "recent_reviews": recent_reviews
@@ -433,4 +494,5 @@ async def view_profile_as_seeker(
         "provider_note": "This is exactly how seekers see your profile. The hourly rate shown includes the platform fee."
     }
     
-    return seeker_view
\ No newline at end of file
+    # Cached as JSON, so convert datetimes and enums up front
+    return jsonable_encoder(seeker_view)
\ No newline at end of file
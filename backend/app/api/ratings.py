@@ -1,15 +1,37 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Optional
 from app.core.deps import get_db, get_current_active_user
 from app.models.user import User, UserRole
 from app.models.booking import Booking, BookingStatus
 from app.models.rating import Rating
 from app.models.profile import Profile
+from app.services.cache import cache_get_or_set, cache_delete, provider_view_cache_key
 from pydantic import BaseModel
 
 router = APIRouter()
 
+# Ratings are created and deleted rarely; both drop the provider's cached histogram
+RATING_DISTRIBUTION_CACHE_TTL = 300
+
+def rating_distribution_cache_key(user_id: int) -> str:
+    """Cache key for a user's star rating histogram"""
+    return f"v1:ratings:{user_id}:distribution"
+
+def get_rating_distribution(db: Session, user_id: int) -> Dict[str, int]:
+    """Number of ratings a user received per star value (1-5), counted in SQL and cached"""
+    def load() -> Dict[str, int]:
+        rating_distribution = {str(i): 0 for i in range(1, 6)}
+        for stars, count in db.query(Rating.rating, func.count(Rating.id)).filter(
+            Rating.rated_user == user_id
+        ).group_by(Rating.rating).all():
+            rating_distribution[str(stars)] = count
+        return rating_distribution
+    
+    return cache_get_or_set(rating_distribution_cache_key(user_id), RATING_DISTRIBUTION_CACHE_TTL, load)
+
 class RatingCreate(BaseModel):
     booking_id: int
     rating: int  # 1-5 stars
@@ -35,7 +57,7 @@ class ProviderRatingsSummary(BaseModel):
     recent_reviews: List[RatingResponse]
 
 @router.post("/create", response_model=RatingResponse)
-async def create_rating(
+def create_rating(
     request: RatingCreate,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -71,18 +93,6 @@ async def create_rating(
             detail="You can only rate bookings you were part of"
         )
     
-    # Check if rating already exists
-    existing_rating = db.query(Rating).filter(
-        Rating.booking_id == request.booking_id,
-        Rating.rated_by == current_user.id
-    ).first()
-    
-    if existing_rating:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="You have already rated this booking"
-        )
-    
     # Determine who is being rated
     if current_user.id == booking.seeker_id:
         rated_user_id = booking.provider_id  # Seeker rating provider
@@ -100,8 +110,17 @@ async def create_rating(
     )
     
     db.add(rating)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Repeat ratings are rejected by the unique constraint on (booking_id, rated_by)
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You have already rated this booking"
+        )
     db.refresh(rating)
+    cache_delete(rating_distribution_cache_key(rated_user_id), provider_view_cache_key(rated_user_id, "seeker_view"))
     
     # Get reviewer name
     reviewer_name = "Anonymous" if request.is_anonymous else (
@@ -121,7 +140,7 @@ async def create_rating(
     )
 
 @router.get("/provider/{provider_id}", response_model=ProviderRatingsSummary)
-async def get_provider_ratings(
+def get_provider_ratings(
     provider_id: int,
     db: Session = Depends(get_db)
 ):
@@ -142,10 +161,10 @@ async def get_provider_ratings(
     profile = db.query(Profile).filter(Profile.user_id == provider_id).first()
     provider_name = profile.name if profile and profile.name else "Provider"
     
-    # Get all ratings for this provider
-    ratings = db.query(Rating).filter(Rating.rated_user == provider_id).all()
+    rating_distribution = get_rating_distribution(db, provider_id)
+    total_ratings = sum(rating_distribution.values())
     
-    if not ratings:
+    if not total_ratings:
         return ProviderRatingsSummary(
             provider_id=provider_id,
             provider_name=provider_name,
@@ -155,22 +174,18 @@ async def get_provider_ratings(
             recent_reviews=[]
         )
     
-    # Calculate statistics
-    total_ratings = len(ratings)
-    average_rating = sum(r.rating for r in ratings) / total_ratings
-    
-    # Rating distribution (1-5 stars)
-    rating_distribution = {str(i): 0 for i in range(1, 6)}
-    for rating in ratings:
-        rating_distribution[str(rating.rating)] += 1
+    average_rating = sum(int(stars) * count for stars, count in rating_distribution.items()) / total_ratings
     
     # Get recent reviews (last 10)
-    recent_ratings = sorted(ratings, key=lambda x: x.created_at, reverse=True)[:10]
+    recent_ratings = db.query(Rating).filter(
+        Rating.rated_user == provider_id
+    ).order_by(Rating.created_at.desc()).limit(10).options(
+        selectinload(Rating.rater).selectinload(User.profile)
+    ).all()
     recent_reviews = []
     
     for rating in recent_ratings:
-        # Get reviewer info
-        reviewer = db.query(User).filter(User.id == rating.rated_by).first()
+        reviewer = rating.rater
         reviewer_name = "Anonymous" if rating.is_anonymous else (
             reviewer.profile.name if reviewer.profile and reviewer.profile.name 
             else "User"
@@ -197,7 +212,7 @@ async def get_provider_ratings(
     )
 
 @router.get("/my-ratings")
-async def get_my_ratings(
+def get_my_ratings(
     current_user: User = Depends(get_current_active_user),
     as_reviewer: bool = True,
     db: Session = Depends(get_db)
@@ -205,21 +220,23 @@ async def get_my_ratings(
     """Get ratings given or received by current user"""
     if as_reviewer:
         # Ratings given by current user
-        ratings = db.query(Rating).filter(Rating.rated_by == current_user.id).all()
+        query = db.query(Rating).filter(Rating.rated_by == current_user.id)
+        other_user_rel = Rating.rated_user_rel
     else:
         # Ratings received by current user
-        ratings = db.query(Rating).filter(Rating.rated_user == current_user.id).all()
+        query = db.query(Rating).filter(Rating.rated_user == current_user.id)
+        other_user_rel = Rating.rater
+    
+    # Load bookings and the other party's profile with the ratings instead of per row
+    ratings = query.options(
+        selectinload(Rating.booking),
+        selectinload(other_user_rel).selectinload(User.profile)
+    ).all()
     
     rating_responses = []
     for rating in ratings:
-        # Get booking details
-        booking = db.query(Booking).filter(Booking.id == rating.booking_id).first()
-        
-        # Get other user's info
-        if as_reviewer:
-            other_user = db.query(User).filter(User.id == rating.rated_user).first()
-        else:
-            other_user = db.query(User).filter(User.id == rating.rated_by).first()
+        booking = rating.booking
+        other_user = rating.rated_user_rel if as_reviewer else rating.rater
         
         other_user_name = "Anonymous" if (not as_reviewer and rating.is_anonymous) else (
             other_user.profile.name if other_user.profile and other_user.profile.name 
@@ -241,7 +258,7 @@ async def get_my_ratings(
     return {"ratings": rating_responses}
 
 @router.put("/respond/{rating_id}")
-async def respond_to_rating(
+def respond_to_rating(
     rating_id: int,
     response: str,
     current_user: User = Depends(get_current_active_user),
@@ -279,20 +296,25 @@ async def respond_to_rating(
     
     rating.provider_response = response
     db.commit()
+    cache_delete(provider_view_cache_key(current_user.id, "seeker_view"))
     
     return {"success": True, "message": "Response added successfully"}
 
 @router.get("/statistics")
-async def get_rating_statistics(
+def get_rating_statistics(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get rating statistics for current user"""
     if current_user.role == UserRole.PROVIDER:
         # Provider statistics
-        ratings = db.query(Rating).filter(Rating.rated_user == current_user.id).all()
+        star_counts = db.query(
+            Rating.rating,
+            func.count(Rating.id),
+            func.count(case((Rating.provider_response != "", 1)))
+        ).filter(Rating.rated_user == current_user.id).group_by(Rating.rating).all()
         
-        if not ratings:
+        if not star_counts:
             return {
                 "user_type": "provider",
                 "total_ratings": 0,
@@ -301,17 +323,16 @@ async def get_rating_statistics(
                 "response_rate": 0.0
             }
         
-        total_ratings = len(ratings)
-        average_rating = sum(r.rating for r in ratings) / total_ratings
+        total_ratings = sum(count for _, count, _ in star_counts)
+        average_rating = sum(stars * count for stars, count, _ in star_counts) / total_ratings
         
         # Rating distribution
         rating_distribution = {str(i): 0 for i in range(1, 6)}
         responses_given = 0
         
-        for rating in ratings:
-            rating_distribution[str(rating.rating)] += 1
-            if rating.provider_response:
-                responses_given += 1
+        for stars, count, responded in star_counts:
+            rating_distribution[str(stars)] += count
+            responses_given += responded
         
         response_rate = (responses_given / total_ratings) * 100 if total_ratings > 0 else 0
         
@@ -341,7 +362,7 @@ async def get_rating_statistics(
         }
 
 @router.delete("/{rating_id}")
-async def delete_rating(
+def delete_rating(
     rating_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -371,5 +392,6 @@ async def delete_rating(
     
     db.delete(rating)
     db.commit()
+    cache_delete(rating_distribution_cache_key(rating.rated_user), provider_view_cache_key(rating.rated_user, "seeker_view"))
     
     return {"success": True, "message": "Rating deleted successfully"}
\ No newline at end of file
@@ -1,14 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased, selectinload, raiseload
+from sqlalchemy import func, inspect, literal_column, update
 from typing import List, Optional
 from app.core.deps import get_db, get_current_active_user, get_admin_user
 from app.models.user import User, UserRole
 from app.models.support import SupportTicket, SupportMessage, HelpArticle, SupportCategory, SupportPriority, SupportStatus
 from app.services.email import send_support_ticket_email
+from app.services.cache import cache_get_or_set, cache_incr
 from pydantic import BaseModel
+import asyncio
+import secrets
+from functools import lru_cache
 
 router = APIRouter()
 
+SUPPORT_AGENT_ROLES = frozenset({UserRole.EMPLOYEE, UserRole.MANAGER, UserRole.ADMIN})
+# Staff changes are rare; a short TTL keeps new agents from waiting long for tickets
+SUPPORT_AGENTS_CACHE_KEY = "v1:support:agent_ids"
+SUPPORT_AGENTS_CACHE_TTL = 30
+SUPPORT_AGENT_ROUND_ROBIN_KEY = "v1:support:agent_rr"
+
+# Generated, GIN-indexed tsvector over title, tags and content (see app/models/support.py).
+# It isn't mapped on HelpArticle so the model can still be created without PostgreSQL.
+HELP_ARTICLE_SEARCH_TSV = literal_column("help_articles.search_tsv")
+
+@lru_cache(maxsize=None)
+def has_help_article_search_tsv(bind) -> bool:
+    """Whether the database has the search_tsv column; checked once per engine"""
+    return bind.dialect.name == "postgresql" and any(
+        column["name"] == "search_tsv" for column in inspect(bind).get_columns("help_articles")
+    )
+
 class SupportTicketCreate(BaseModel):
     category: SupportCategory
     priority: SupportPriority = SupportPriority.MEDIUM
@@ -46,6 +68,25 @@ class HelpArticleResponse(BaseModel):
     views: int
     helpful_votes: int
 
+def next_support_agent(db: Session) -> Optional[int]:
+    """Pick the next active support agent in round-robin order, or None if there are none"""
+    agent_ids = cache_get_or_set(
+        SUPPORT_AGENTS_CACHE_KEY,
+        SUPPORT_AGENTS_CACHE_TTL,
+        lambda: [agent_id for agent_id, in db.query(User.id).filter(
+            User.role.in_(SUPPORT_AGENT_ROLES),
+            User.is_active == True
+        ).order_by(User.id).all()]
+    )
+    if not agent_ids:
+        return None
+    
+    # A shared counter keeps assignments even across workers; fall back to random if Redis is down
+    position = cache_incr(SUPPORT_AGENT_ROUND_ROBIN_KEY)
+    if position is None:
+        return secrets.choice(agent_ids)
+    return agent_ids[position % len(agent_ids)]
+
 @router.post("/tickets", response_model=SupportTicketResponse)
 async def create_support_ticket(
     request: SupportTicketCreate,
@@ -53,12 +94,15 @@ async def create_support_ticket(
     db: Session = Depends(get_db)
 ):
     """Create a new support ticket"""
+    # Agent selection makes blocking Redis (and on a cache miss, DB) calls
+    assigned_agent = await asyncio.to_thread(next_support_agent, db)
     ticket = SupportTicket(
         user_id=current_user.id,
         category=request.category,
         priority=request.priority,
         subject=request.subject,
-        description=request.description
+        description=request.description,
+        assigned_agent=assigned_agent
     )
     
     db.add(ticket)
@@ -71,17 +115,6 @@ async def create_support_ticket(
     except Exception as e:
         print(f"Failed to send support ticket email: {e}")
     
-    # Auto-assign to available agent (simplified)
-    available_agents = db.query(User).filter(
-        User.role.in_([UserRole.EMPLOYEE, UserRole.MANAGER, UserRole.ADMIN]),
-        User.is_active == True
-    ).all()
-    
-    if available_agents:
-        # Simple round-robin assignment
-        ticket.assigned_agent = available_agents[ticket.id % len(available_agents)].id
-        db.commit()
-    
     return SupportTicketResponse(
         id=ticket.id,
         category=ticket.category,
@@ -144,17 +177,21 @@ async def get_ticket_messages(
             detail="Access denied"
         )
     
-    messages = db.query(SupportMessage).filter(
-        SupportMessage.ticket_id == ticket_id
-    ).order_by(SupportMessage.created_at.asc()).all()
+    # Senders and their profiles are loaded with the messages rather than per message
+    query = db.query(SupportMessage).options(
+        selectinload(SupportMessage.sender).joinedload(User.profile),
+        raiseload("*")
+    ).filter(SupportMessage.ticket_id == ticket_id)
     
     # Filter internal messages for regular users
     if current_user.role not in [UserRole.EMPLOYEE, UserRole.MANAGER, UserRole.ADMIN, UserRole.SUPER_ADMIN]:
-        messages = [msg for msg in messages if not msg.is_internal]
+        query = query.filter(SupportMessage.is_internal == False)
+    
+    messages = query.order_by(SupportMessage.created_at.asc()).all()
     
     message_responses = []
     for msg in messages:
-        sender = db.query(User).filter(User.id == msg.sender_id).first()
+        sender = msg.sender
         sender_name = "Support Agent" if sender.role in [UserRole.EMPLOYEE, UserRole.MANAGER, UserRole.ADMIN] else (sender.profile.name if sender.profile else sender.email)
         
         message_responses.append(SupportMessageResponse(
@@ -230,12 +267,18 @@ async def get_help_articles(
     if category:
         query = query.filter(HelpArticle.category == category)
     
-    if search:
+    if search and not has_help_article_search_tsv(db.get_bind()):
+        # Databases without the column (SQLite, or add_help_article_search.py not yet run)
         query = query.filter(
             HelpArticle.title.ilike(f"%{search}%") |
             HelpArticle.content.ilike(f"%{search}%") |
             HelpArticle.tags.ilike(f"%{search}%")
         )
+    elif search:
+        search_query = func.plainto_tsquery("english", search)
+        query = query.filter(HELP_ARTICLE_SEARCH_TSV.op("@@")(search_query)).order_by(
+            func.ts_rank(HELP_ARTICLE_SEARCH_TSV, search_query).desc()
+        )
     
     articles = query.order_by(HelpArticle.views.desc()).all()
     
@@ -258,7 +301,21 @@ async def get_help_article(
     db: Session = Depends(get_db)
 ):
     """Get specific help article and increment view count"""
-    article = db.query(HelpArticle).filter(HelpArticle.id == article_id).first()
+    # Increment in SQL so concurrent views aren't lost, reading the article back in the same statement
+    article = db.execute(
+        update(HelpArticle)
+        .where(HelpArticle.id == article_id)
+        .values(views=HelpArticle.views + 1)
+        .returning(
+            HelpArticle.id,
+            HelpArticle.category,
+            HelpArticle.title,
+            HelpArticle.content,
+            HelpArticle.tags,
+            HelpArticle.views,
+            HelpArticle.helpful_votes
+        )
+    ).first()
     
     if not article:
         raise HTTPException(
@@ -266,8 +323,6 @@ async def get_help_article(
             detail="Article not found"
         )
     
-    # Increment view count
-    article.views += 1
     db.commit()
     
     return HelpArticleResponse(
@@ -286,15 +341,17 @@ async def mark_article_helpful(
     db: Session = Depends(get_db)
 ):
     """Mark help article as helpful"""
-    article = db.query(HelpArticle).filter(HelpArticle.id == article_id).first()
+    updated = db.query(HelpArticle).filter(HelpArticle.id == article_id).update(
+        {HelpArticle.helpful_votes: HelpArticle.helpful_votes + 1},
+        synchronize_session=False
+    )
     
-    if not article:
+    if not updated:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Article not found"
         )
     
-    article.helpful_votes += 1
     db.commit()
     
     return {"success": True, "message": "Thank you for your feedback!"}
@@ -315,7 +372,12 @@ async def get_all_support_tickets(
     db: Session = Depends(get_db)
 ):
     """Get all support tickets for admin management"""
-    query = db.query(SupportTicket)
+    # Requester and agent emails come from the same query instead of two lookups per ticket
+    requester = aliased(User)
+    agent = aliased(User)
+    query = db.query(SupportTicket, requester.email, agent.email).join(
+        requester, SupportTicket.user_id == requester.id
+    ).outerjoin(agent, SupportTicket.assigned_agent == agent.id)
     
     if status_filter:
         query = query.filter(SupportTicket.status == status_filter)
@@ -326,21 +388,18 @@ async def get_all_support_tickets(
     if assigned_to_me:
         query = query.filter(SupportTicket.assigned_agent == current_user.id)
     
-    tickets = query.order_by(SupportTicket.created_at.desc()).all()
+    rows = query.order_by(SupportTicket.created_at.desc()).all()
     
     ticket_data = []
-    for ticket in tickets:
-        user = db.query(User).filter(User.id == ticket.user_id).first()
-        agent = db.query(User).filter(User.id == ticket.assigned_agent).first() if ticket.assigned_agent else None
-        
+    for ticket, user_email, agent_email in rows:
         ticket_data.append({
             "id": ticket.id,
-            "user_email": user.email,
+            "user_email": user_email,
             "category": ticket.category,
             "priority": ticket.priority,
             "subject": ticket.subject,
             "status": ticket.status,
-            "assigned_agent": agent.email if agent else None,
+            "assigned_agent": agent_email,
             "created_at": ticket.created_at.isoformat(),
             "updated_at": ticket.updated_at.isoformat() if ticket.updated_at else None
         })
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi.responses import FileResponse, Response
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.core.deps import get_db, get_current_active_user
 from app.models.user import User
 from app.models.profile import Profile, ProfileVerificationStatus
+from app.services.cache import invalidate_provider
+from app.services.images import (
+    strip_image_metadata, generate_profile_image_variants, delete_profile_image_variants,
+    profile_image_variant_path, PROFILE_IMAGE_SIZES
+)
+import asyncio
 import os
 import uuid
-import shutil
+import aiofiles
 from pathlib import Path
 from typing import Optional, List
 import mimetypes
@@ -20,23 +27,21 @@ VERIFICATION_DOCS_DIR = UPLOAD_DIR / "verification_docs"
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp", "image/jpg"}
 ALLOWED_DOC_TYPES = {"application/pdf", "image/jpeg", "image/png"}
+UPLOAD_CHUNK_SIZE = 64 * 1024  # bytes read and written per await while saving
 
 # Ensure upload directories exist
 UPLOAD_DIR.mkdir(exist_ok=True)
 PROFILE_IMAGES_DIR.mkdir(exist_ok=True)
 VERIFICATION_DOCS_DIR.mkdir(exist_ok=True)
 
-def validate_file_size(file: UploadFile):
-    """Validate file size"""
-    file.file.seek(0, 2)  # Seek to end
-    file_size = file.file.tell()
-    file.file.seek(0)  # Reset to beginning
-    
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File too large. Maximum size: {MAX_FILE_SIZE // 1024 // 1024}MB"
+def serve_upload(file_path: Path) -> Response:
+    """Respond with an uploaded file, handing the transfer to Nginx when it fronts the API"""
+    if settings.UPLOADS_ACCEL_REDIRECT_PREFIX:
+        return Response(
+            headers={"X-Accel-Redirect": f"{settings.UPLOADS_ACCEL_REDIRECT_PREFIX}/{file_path.relative_to(UPLOAD_DIR).as_posix()}"},
+            media_type=mimetypes.guess_type(file_path.name)[0]
         )
+    return FileResponse(file_path)
 
 def validate_file_type(file: UploadFile, allowed_types: set):
     """Validate file type"""
@@ -58,30 +63,62 @@ def generate_unique_filename(original_filename: str) -> str:
     unique_id = str(uuid.uuid4())
     return f"{unique_id}{file_ext}"
 
-def save_uploaded_file(file: UploadFile, upload_dir: Path) -> str:
-    """Save uploaded file and return the filename"""
+async def save_uploaded_file(file: UploadFile, upload_dir: Path) -> str:
+    """
+    Save uploaded file in chunks without blocking the event loop and return the filename.
+    The size limit is enforced while streaming, so oversized files are rejected as soon
+    as they cross it and the partial file is removed.
+    """
     filename = generate_unique_filename(file.filename)
     file_path = upload_dir / filename
     
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        total_size = 0
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                total_size += len(chunk)
+                if total_size > MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File too large. Maximum size: {MAX_FILE_SIZE // 1024 // 1024}MB"
+                    )
+                await buffer.write(chunk)
         return filename
+    except HTTPException:
+        file_path.unlink(missing_ok=True)
+        raise
     except Exception as e:
+        file_path.unlink(missing_ok=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to save file: {str(e)}"
         )
 
+async def save_profile_image(file: UploadFile) -> str:
+    """Save an uploaded profile image with its metadata stripped and return the filename"""
+    filename = await save_uploaded_file(file, PROFILE_IMAGES_DIR)
+    file_path = PROFILE_IMAGES_DIR / filename
+    
+    try:
+        # Re-encoding is CPU bound; keep it off the event loop
+        await asyncio.to_thread(strip_image_metadata, file_path)
+    except Exception:
+        file_path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid image file"
+        )
+    return filename
+
 @router.post("/profile-image")
 async def upload_profile_image(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Upload a profile image"""
     # Validate file
-    validate_file_size(file)
     validate_file_type(file, ALLOWED_IMAGE_TYPES)
     
     # Get or create profile
@@ -101,8 +138,10 @@ async def upload_profile_image(
         )
     
     # Save file
-    filename = save_uploaded_file(file, PROFILE_IMAGES_DIR)
+    filename = await save_profile_image(file)
     image_url = f"/api/uploads/profile-image/{filename}"
+    # Resize after responding
+    background_tasks.add_task(generate_profile_image_variants, PROFILE_IMAGES_DIR / filename)
     
     # Update profile
     if not profile.images:
@@ -114,6 +153,7 @@ async def upload_profile_image(
         profile.verification_status = ProfileVerificationStatus.PENDING
     
     db.commit()
+    invalidate_provider(current_user.id)
     
     return {
         "success": True,
@@ -131,7 +171,6 @@ async def upload_verification_document(
 ):
     """Upload verification document"""
     # Validate file
-    validate_file_size(file)
     validate_file_type(file, ALLOWED_DOC_TYPES)
     
     # Validate document type
@@ -143,7 +182,7 @@ async def upload_verification_document(
         )
     
     # Save file
-    filename = save_uploaded_file(file, VERIFICATION_DOCS_DIR)
+    filename = await save_uploaded_file(file, VERIFICATION_DOCS_DIR)
     doc_url = f"/api/uploads/verification-document/{filename}"
     
     # Store in user profile or verification table
@@ -194,6 +233,7 @@ async def delete_profile_image(
     # Remove from database
     profile.images.pop(image_index)
     db.commit()
+    invalidate_provider(current_user.id)
     
     # Try to delete the file from filesystem
     try:
@@ -202,6 +242,7 @@ async def delete_profile_image(
             file_path = PROFILE_IMAGES_DIR / filename
             if file_path.exists():
                 file_path.unlink()
+            delete_profile_image_variants(file_path)
     except Exception as e:
         print(f"Warning: Could not delete file {image_url}: {e}")
     
@@ -212,17 +253,28 @@ async def delete_profile_image(
     }
 
 @router.get("/profile-image/{filename}")
-async def get_profile_image(filename: str):
-    """Serve profile images"""
+async def get_profile_image(filename: str, size: Optional[int] = None):
+    """Serve profile images, or a resized copy when size is one of PROFILE_IMAGE_SIZES"""
     file_path = PROFILE_IMAGES_DIR / filename
     
+    if size is not None:
+        if size not in PROFILE_IMAGE_SIZES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Size must be one of {', '.join(map(str, PROFILE_IMAGE_SIZES))}"
+            )
+        variant_path = profile_image_variant_path(file_path, size)
+        # Variants are generated after upload; serve the original until it exists
+        if variant_path.exists():
+            return serve_upload(variant_path)
+    
     if not file_path.exists():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Image not found"
         )
     
-    return FileResponse(file_path)
+    return serve_upload(file_path)
 
 @router.get("/verification-document/{filename}")
 async def get_verification_document(
@@ -239,7 +291,7 @@ async def get_verification_document(
             detail="Document not found"
         )
     
-    return FileResponse(file_path)
+    return serve_upload(file_path)
 
 @router.get("/my-images")
 async def get_my_images(
@@ -256,6 +308,7 @@ async def get_my_images(
 
 @router.post("/bulk-profile-images")
 async def upload_bulk_profile_images(
+    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -285,43 +338,51 @@ async def upload_bulk_profile_images(
     
     uploaded_images = []
     errors = []
+    valid_files = []
     
-    for i, file in enumerate(files):
+    # Validate each file
+    for file in files:
         try:
-            # Validate each file
-            validate_file_size(file)
             validate_file_type(file, ALLOWED_IMAGE_TYPES)
-            
-            # Save file
-            filename = save_uploaded_file(file, PROFILE_IMAGES_DIR)
-            image_url = f"/api/uploads/profile-image/{filename}"
-            
-            uploaded_images.append({
-                "original_filename": file.filename,
-                "url": image_url
-            })
-            
-            # Update profile
-            if not profile.images:
-                profile.images = []
-            profile.images.append(image_url)
-            
+            valid_files.append(file)
         except HTTPException as e:
             errors.append({
                 "filename": file.filename,
                 "error": e.detail
             })
-        except Exception as e:
+    
+    # Save the valid files concurrently
+    results = await asyncio.gather(
+        *[save_profile_image(file) for file in valid_files],
+        return_exceptions=True
+    )
+    
+    for file, result in zip(valid_files, results):
+        if isinstance(result, Exception):
             errors.append({
                 "filename": file.filename,
-                "error": str(e)
+                "error": result.detail if isinstance(result, HTTPException) else str(result)
             })
+            continue
+        
+        image_url = f"/api/uploads/profile-image/{result}"
+        background_tasks.add_task(generate_profile_image_variants, PROFILE_IMAGES_DIR / result)
+        uploaded_images.append({
+            "original_filename": file.filename,
+            "url": image_url
+        })
+        
+        # Update profile
+        if not profile.images:
+            profile.images = []
+        profile.images.append(image_url)
     
     # Mark for re-verification if images were uploaded
     if uploaded_images and profile.verification_status == ProfileVerificationStatus.APPROVED:
         profile.verification_status = ProfileVerificationStatus.PENDING
     
     db.commit()
+    invalidate_provider(current_user.id)
     
     return {
         "success": len(uploaded_images) > 0,
@@ -1,13 +1,13 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-import json
+from sqlalchemy.orm import Session, joinedload, raiseload
 import logging
+import orjson
 from typing import Optional
 
 from app.core.deps import get_db
 from app.core.security import decode_access_token
 from app.models.user import User
-from app.services.websocket import websocket_manager
+from app.services.websocket import websocket_manager, encode_message
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -26,13 +26,16 @@ async def websocket_endpoint(
             await websocket.close(code=4001, reason="Invalid authentication token")
             return
 
-        user_email = payload.get("sub")
-        if not user_email:
+        user_id = payload.get("sub")
+        if not user_id:
             await websocket.close(code=4001, reason="Invalid token payload")
             return
 
-        # Get user from database
-        user = db.query(User).filter(User.email == user_email).first()
+        # Get user from database; the profile is used for typing indicators for the
+        # life of the connection, so load it now and refuse any other lazy load
+        user = db.query(User).options(
+            joinedload(User.profile), raiseload("*")
+        ).filter(User.id == user_id).first()
         if not user or not user.is_active:
             await websocket.close(code=4001, reason="User not found or inactive")
             return
@@ -45,16 +48,16 @@ async def websocket_endpoint(
             while True:
                 data = await websocket.receive_text()
                 try:
-                    message = json.loads(data)
+                    message = orjson.loads(data)
                     await handle_client_message(websocket, user, message, db)
-                except json.JSONDecodeError:
-                    await websocket.send_text(json.dumps({
+                except orjson.JSONDecodeError:
+                    await websocket.send_text(encode_message({
                         "type": "error",
                         "message": "Invalid JSON format"
                     }))
                 except Exception as e:
                     logger.error(f"Error handling client message: {e}")
-                    await websocket.send_text(json.dumps({
+                    await websocket.send_text(encode_message({
                         "type": "error",
                         "message": "Error processing message"
                     }))
@@ -64,7 +67,7 @@ async def websocket_endpoint(
         except Exception as e:
             logger.error(f"WebSocket error for user {user.id}: {e}")
         finally:
-            websocket_manager.disconnect(websocket)
+            await websocket_manager.disconnect(websocket)
 
     except Exception as e:
         logger.error(f"WebSocket authentication error: {e}")
@@ -78,8 +81,9 @@ async def handle_client_message(websocket: WebSocket, user: User, message: dict,
     message_type = message.get("type")
     
     if message_type == "ping":
-        # Heartbeat/ping message
-        await websocket.send_text(json.dumps({
+        # Heartbeat/ping message; keeps the user marked online
+        await websocket_manager.refresh_presence(user.id)
+        await websocket.send_text(encode_message({
             "type": "pong",
             "timestamp": message.get("timestamp")
         }))
@@ -89,7 +93,7 @@ async def handle_client_message(websocket: WebSocket, user: User, message: dict,
         status = message.get("status", "online")
         # Here you could update user status in database if needed
         # For now, just acknowledge
-        await websocket.send_text(json.dumps({
+        await websocket.send_text(encode_message({
             "type": "status_updated",
             "status": status
         }))
@@ -98,7 +102,7 @@ async def handle_client_message(websocket: WebSocket, user: User, message: dict,
         # Client wants to join a specific room (e.g., for chat)
         room_id = message.get("room_id")
         # Implement room-based messaging if needed
-        await websocket.send_text(json.dumps({
+        await websocket.send_text(encode_message({
             "type": "joined_room",
             "room_id": room_id
         }))
@@ -108,7 +112,7 @@ async def handle_client_message(websocket: WebSocket, user: User, message: dict,
         chat_id = message.get("chat_id")
         recipient_id = message.get("recipient_id")
         
-        if recipient_id:
+        if recipient_id and websocket_manager.should_send_typing(user.id, chat_id):
             typing_data = {
                 "chat_id": chat_id,
                 "user_name": user.profile.name if user.profile else "Unknown",
@@ -120,7 +124,7 @@ async def handle_client_message(websocket: WebSocket, user: User, message: dict,
             })
     
     else:
-        await websocket.send_text(json.dumps({
+        await websocket.send_text(encode_message({
             "type": "error",
             "message": f"Unknown message type: {message_type}"
         }))
@@ -129,8 +133,8 @@ async def handle_client_message(websocket: WebSocket, user: User, message: dict,
 async def get_online_users():
     """Get list of online user IDs (admin/debugging endpoint)"""
     return {
-        "online_users": websocket_manager.get_online_users(),
-        "total_count": websocket_manager.get_user_count()
+        "online_users": await websocket_manager.get_online_users(),
+        "total_count": await websocket_manager.get_user_count()
     }
 
 @router.get("/user-status/{user_id}")
@@ -138,5 +142,5 @@ async def get_user_status(user_id: int):
     """Check if a specific user is online"""
     return {
         "user_id": user_id,
-        "is_online": websocket_manager.is_user_online(user_id)
+        "is_online": await websocket_manager.is_user_online(user_id)
     }
\ No newline at end of file
@@ -13,6 +13,11 @@ class Settings:
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "postgresql://rishovsen@localhost/chillconnect")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "3600"))  # seconds
+    # Dev/CI only: make unintended lazy relationship loads (N+1 queries) raise
+    RAISE_ON_LAZY_LOAD: bool = os.getenv("RAISE_ON_LAZY_LOAD", "false").lower() == "true"
     
     # CORS
     ALLOWED_HOSTS: List[str] = ["http://localhost:3000", "https://your-domain.vercel.app"]
@@ -34,6 +39,8 @@ class Settings:
     # File uploads
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 5 * 1024 * 1024  # 5MB
+    # Internal Nginx location aliased to UPLOAD_DIR; when set, file bytes are sent by Nginx via X-Accel-Redirect
+    UPLOADS_ACCEL_REDIRECT_PREFIX: str = os.getenv("UPLOADS_ACCEL_REDIRECT_PREFIX", "").rstrip("/")
     
     # Token economy
     TOKEN_VALUE_INR: int = 100  # 1 token = ₹100
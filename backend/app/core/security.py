@@ -1,11 +1,20 @@
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Dict, Optional, Tuple, Union
+import threading
+import time
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Verified token payloads are reused for up to TOKEN_CACHE_TTL seconds (never past
+# their exp) so repeat requests with the same token skip signature verification
+TOKEN_CACHE_TTL = 300  # seconds
+TOKEN_CACHE_SIZE = 10_000
+_token_cache: Dict[str, Tuple[float, dict]] = {}
+_token_cache_lock = threading.Lock()
+
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta = None
 ) -> str:
@@ -25,11 +34,33 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-def verify_token(token: str) -> Union[str, None]:
+def decode_access_token(token: str) -> Optional[dict]:
+    """Verified payload of an access token, or None if it is invalid or expired"""
+    now = time.time()
+    with _token_cache_lock:
+        cached = _token_cache.get(token)
+    if cached is not None:
+        expires_at, payload = cached
+        if now < expires_at:
+            return payload
+    
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        return payload.get("sub")
     except jwt.JWTError:
-        return None
\ No newline at end of file
+        return None
+    
+    # Only valid tokens are cached, so bad tokens can't flood the cache
+    expires_at = min(now + TOKEN_CACHE_TTL, payload.get("exp", now))
+    with _token_cache_lock:
+        _token_cache.pop(token, None)
+        if len(_token_cache) >= TOKEN_CACHE_SIZE:
+            # Evict the oldest entry
+            del _token_cache[next(iter(_token_cache))]
+        _token_cache[token] = (expires_at, payload)
+    return payload
+
+def verify_token(token: str) -> Union[str, None]:
+    payload = decode_access_token(token)
+    return payload.get("sub") if payload else None
\ No newline at end of file
@@ -1,11 +1,28 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, raiseload
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+# Sync handlers run in FastAPI's threadpool, so size the pool for concurrent requests
+# rather than the default of 5, and check connections before use so stale ones are replaced
+engine = create_engine(
+    settings.DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=settings.DB_POOL_RECYCLE
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def raise_on_lazy_load(execute_state):
+    """do_orm_execute hook that makes lazy relationship loads raise instead of issuing a query"""
+    if (execute_state.is_select and execute_state.all_mappers
+            and not execute_state.is_column_load and not execute_state.is_relationship_load):
+        execute_state.statement = execute_state.statement.options(raiseload("*"))
+
+if settings.RAISE_ON_LAZY_LOAD:
+    event.listen(SessionLocal, "do_orm_execute", raise_on_lazy_load)
+
 Base = declarative_base()
 
 def get_db():
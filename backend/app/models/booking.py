@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -25,7 +25,7 @@ class Booking(Base):
     start_time = Column(DateTime(timezone=True), nullable=False)
     duration_hours = Column(Integer, nullable=False)
     total_tokens = Column(Integer, nullable=False)
-    booking_type = Column(Enum(BookingType), nullable=False)
+    booking_type = Column(Enum(BookingType), nullable=False, server_default=BookingType.OUTCALL.name)
     status = Column(Enum(BookingStatus), default=BookingStatus.PENDING)
     assigned_employee = Column(Integer, ForeignKey("users.id"), nullable=True)
     special_requests = Column(Text, nullable=True)
@@ -33,6 +33,12 @@ class Booking(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        Index("ix_bookings_status_start_time", status, start_time),
+        Index("ix_bookings_seeker_created", seeker_id, created_at.desc()),
+        Index("ix_bookings_provider_created", provider_id, created_at.desc()),
+    )
+    
     # Relationships
     seeker = relationship("User", foreign_keys=[seeker_id], back_populates="seeker_bookings")
     provider = relationship("User", foreign_keys=[provider_id], back_populates="provider_bookings")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, Boolean, JSON, ARRAY
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, Boolean, JSON, ARRAY, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -41,6 +41,12 @@ class ChatMessage(Base):
     flagged_reason = Column(String(255), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    __table_args__ = (
+        Index("ix_chat_msg_booking_created", booking_id, created_at),
+        # Flagged messages are rare; a partial index keeps the review queue lookup small
+        Index("ix_chat_msg_flagged", created_at.desc(), id.desc(), postgresql_where=text("is_flagged = true")),
+    )
+    
     # Relationships
     booking = relationship("Booking", back_populates="chat_messages")
     sender = relationship("User", back_populates="sent_messages")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -34,6 +34,10 @@ class Dispute(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     resolved_at = Column(DateTime(timezone=True), nullable=True)
     
+    __table_args__ = (
+        Index("ix_disputes_status_created_at", status, created_at.desc()),
+    )
+    
     # Relationships
     booking = relationship("Booking", back_populates="disputes")
     reporter = relationship("User", foreign_keys=[reported_by], back_populates="disputes")
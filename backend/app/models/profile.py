@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, ARRAY, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, ARRAY, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -23,8 +23,23 @@ class Profile(Base):
     verification_status = Column(Enum(ProfileVerificationStatus), default=ProfileVerificationStatus.PENDING)
     services_offered = Column(ARRAY(String), nullable=True)
     languages = Column(ARRAY(String), nullable=True)
+    # Maintained by Rating mapper events (see app/models/rating.py)
+    total_ratings = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        # Back the array containment (@>) filters used by provider search
+        Index("ix_profiles_services_gin", services_offered, postgresql_using="gin"),
+        Index("ix_profiles_languages_gin", languages, postgresql_using="gin"),
+        # Approved-status and rate range predicates, carrying the join key to users
+        Index("ix_profiles_search", verification_status, hourly_rate, postgresql_include=["user_id"]),
+    )
+    
     # Relationships
-    user = relationship("User", back_populates="profile")
\ No newline at end of file
+    user = relationship("User", back_populates="profile")
+    
+    @property
+    def avg_rating(self) -> float:
+        return self.rating_sum / self.total_ratings if self.total_ratings else 0.0
\ No newline at end of file
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, CheckConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, CheckConstraint, Index, UniqueConstraint, event, inspect, select, update
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database.database import Base
+from app.models.profile import Profile
 
 class Rating(Base):
     __tablename__ = "ratings"
@@ -18,9 +19,51 @@ class Rating(Base):
     
     __table_args__ = (
         CheckConstraint('rating >= 1 AND rating <= 5', name='rating_range'),
+        UniqueConstraint("booking_id", "rated_by", name="ux_rating_booking_rater"),
+        Index("ix_ratings_rated_user_created", rated_user, created_at.desc()),
     )
     
     # Relationships
     booking = relationship("Booking", back_populates="ratings")
     rater = relationship("User", foreign_keys=[rated_by], back_populates="ratings_given")
-    rated_user_rel = relationship("User", foreign_keys=[rated_user], back_populates="ratings_received")
\ No newline at end of file
+    rated_user_rel = relationship("User", foreign_keys=[rated_user], back_populates="ratings_received")
+
+def adjust_profile_rating_totals(connection, user_id: int, count: int, rating_sum: int):
+    """Apply a rating change to a profile's totals in the flush's transaction"""
+    # Incremental so concurrent ratings for one provider serialize on the profile row
+    connection.execute(
+        update(Profile)
+        .where(Profile.user_id == user_id)
+        .values(
+            total_ratings=Profile.total_ratings + count,
+            rating_sum=Profile.rating_sum + rating_sum
+        )
+    )
+
+@event.listens_for(Rating, "after_insert")
+def rating_inserted(mapper, connection, target):
+    adjust_profile_rating_totals(connection, target.rated_user, 1, target.rating)
+
+@event.listens_for(Rating, "after_delete")
+def rating_deleted(mapper, connection, target):
+    adjust_profile_rating_totals(connection, target.rated_user, -1, -target.rating)
+
+@event.listens_for(Rating, "after_update")
+def rating_updated(mapper, connection, target):
+    state = inspect(target)
+    rating_history = state.attrs.rating.history
+    rated_user_history = state.attrs.rated_user.history
+    if not rating_history.deleted and not rated_user_history.deleted:
+        return
+    old_rating = rating_history.deleted[0] if rating_history.deleted else target.rating
+    old_rated_user = rated_user_history.deleted[0] if rated_user_history.deleted else target.rated_user
+    adjust_profile_rating_totals(connection, old_rated_user, -1, -old_rating)
+    adjust_profile_rating_totals(connection, target.rated_user, 1, target.rating)
+
+@event.listens_for(Profile, "before_insert")
+def profile_inserted(mapper, connection, target):
+    # The user may have been rated before their profile existed
+    target.total_ratings, target.rating_sum = connection.execute(
+        select(func.count(Rating.id), func.coalesce(func.sum(Rating.rating), 0))
+        .where(Rating.rated_user == target.user_id)
+    ).one()
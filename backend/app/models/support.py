@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, Boolean, Index, text, DDL, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -38,6 +38,13 @@ class SupportTicket(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     resolved_at = Column(DateTime(timezone=True), nullable=True)
     
+    __table_args__ = (
+        Index("ix_support_tickets_user_created", user_id, created_at.desc()),
+        Index("ix_support_tickets_status_priority", status, priority),
+        # Most tickets wait unassigned; only index the ones an agent owns
+        Index("ix_support_tickets_agent", assigned_agent, postgresql_where=text("assigned_agent IS NOT NULL")),
+    )
+    
     # Relationships
     user = relationship("User", foreign_keys=[user_id], back_populates="support_tickets")
     agent = relationship("User", foreign_keys=[assigned_agent])
@@ -53,6 +60,10 @@ class SupportMessage(Base):
     is_internal = Column(Boolean, default=False)  # internal agent notes
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    __table_args__ = (
+        Index("ix_support_messages_ticket_created", ticket_id, created_at),
+    )
+    
     # Relationships
     ticket = relationship("SupportTicket", back_populates="messages")
     sender = relationship("User")
@@ -72,4 +83,24 @@ class HelpArticle(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    author = relationship("User")
\ No newline at end of file
+    author = relationship("User")
+
+# Generated tsvector over title, tags and content used by help article search; title
+# matches rank above tags, which rank above body text. PostgreSQL only, so it is added
+# by DDL rather than mapped on HelpArticle (see add_help_article_search.py for
+# databases created before it existed).
+HELP_ARTICLE_SEARCH_TSV_SQL = """
+ALTER TABLE help_articles ADD COLUMN IF NOT EXISTS search_tsv tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(tags, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(content, '')), 'C')
+) STORED;
+"""
+
+event.listen(HelpArticle.__table__, "after_create", DDL(HELP_ARTICLE_SEARCH_TSV_SQL).execute_if(dialect="postgresql"))
+event.listen(
+    HelpArticle.__table__,
+    "after_create",
+    DDL("CREATE INDEX IF NOT EXISTS ix_help_articles_search_tsv ON help_articles USING GIN (search_tsv);").execute_if(dialect="postgresql")
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -33,6 +33,11 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        Index("ix_users_role_created_at", role, created_at.desc()),
+        Index("ix_users_active_role", role, id, postgresql_where=is_active == True),
+    )
+    
     # Relationships
     profile = relationship("Profile", back_populates="user", uselist=False)
     tokens = relationship("Token", back_populates="user", uselist=False)
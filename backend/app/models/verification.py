@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, ARRAY
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, ARRAY, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -28,6 +28,10 @@ class Verification(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
     
+    __table_args__ = (
+        Index("ix_verifications_status_created_at", status, created_at),
+    )
+    
     # Relationships
     user = relationship("User", foreign_keys=[user_id], back_populates="verifications")
     employee = relationship("User", foreign_keys=[employee_id], back_populates="employee_verifications")
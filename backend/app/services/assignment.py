@@ -234,13 +234,15 @@ def reassign_task(db: Session, assignment_id: int, new_employee_id: int, reason:
         return False
     
     # Check if new employee is available
-    new_employee = db.query(User).filter(
-        User.id == new_employee_id,
-        User.role == UserRole.EMPLOYEE,
-        User.is_active == True
-    ).first()
+    employee_available = db.query(
+        db.query(User.id).filter(
+            User.id == new_employee_id,
+            User.role == UserRole.EMPLOYEE,
+            User.is_active == True
+        ).exists()
+    ).scalar()
     
-    if not new_employee:
+    if not employee_available:
         return False
     
     old_employee_id = assignment.employee_id
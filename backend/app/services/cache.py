@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+from typing import Any, Callable, Optional
+import redis
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Redis client for read-through caching of stale-tolerant data
+redis_client = redis.from_url(settings.REDIS_URL)
+
+# Seconds a caller may hold the right to repopulate an expired key
+CACHE_LOCK_TTL = 5
+
+def provider_cache_key(provider_id: int) -> str:
+    """Cache key for the provider summary used by booking endpoints"""
+    return f"v1:provider:{provider_id}:profile"
+
+def cache_generation(name: str) -> int:
+    """Current generation of a group of keys; bumping it orphans every key built from the old one"""
+    try:
+        return int(redis_client.get(f"v1:{name}:generation") or 0)
+    except redis.RedisError as e:
+        logger.warning(f"Cache generation read failed for {name}: {e}")
+        return 0
+
+def bump_cache_generation(name: str) -> None:
+    """Invalidate every key in a group at once, ignoring Redis errors"""
+    try:
+        redis_client.incr(f"v1:{name}:generation")
+    except redis.RedisError as e:
+        logger.warning(f"Cache generation bump failed for {name}: {e}")
+
+def provider_search_cache_key(filters: dict) -> str:
+    """Cache key for one page of provider search results"""
+    digest = hashlib.blake2b(json.dumps(filters, sort_keys=True).encode(), digest_size=16).hexdigest()
+    return f"v1:provider_search:{cache_generation('provider_search')}:{digest}"
+
+def provider_view_cache_key(provider_id: int, view: str) -> str:
+    """Cache key for one of a provider's own dashboard views, which include the platform fee"""
+    return f"v1:provider:{provider_id}:{view}:{cache_generation('platform_fee')}"
+
+def invalidate_provider(provider_id: int) -> None:
+    """Drop everything cached about a provider after their profile or account changes"""
+    cache_delete(
+        provider_cache_key(provider_id),
+        provider_view_cache_key(provider_id, "seeker_view"),
+        provider_view_cache_key(provider_id, "pricing_preview")
+    )
+    bump_cache_generation("provider_search")
+
+def cache_get_or_set(key: str, ttl: int, loader: Callable[[], Any]) -> Any:
+    """
+    Return the cached value for key, calling loader and caching its result on a miss.
+    Only the caller holding the key's lock repopulates it, so concurrent misses don't
+    all write the same value. None results are not cached. Values must be JSON
+    serializable. If Redis is unavailable the loader is used directly.
+    """
+    lock_key = f"{key}:lock"
+    try:
+        cached = redis_client.get(key)
+        if cached is not None:
+            return json.loads(cached)
+        acquired = redis_client.set(lock_key, "1", nx=True, ex=CACHE_LOCK_TTL)
+    except redis.RedisError as e:
+        logger.warning(f"Cache read failed for {key}: {e}")
+        return loader()
+
+    value = loader()
+
+    if acquired:
+        try:
+            if value is not None:
+                redis_client.set(key, json.dumps(value), ex=ttl)
+            redis_client.delete(lock_key)
+        except redis.RedisError as e:
+            logger.warning(f"Cache write failed for {key}: {e}")
+
+    return value
+
+def cache_incr(key: str) -> Optional[int]:
+    """Atomically increment a counter, returning None if Redis is unavailable"""
+    try:
+        return redis_client.incr(key)
+    except redis.RedisError as e:
+        logger.warning(f"Cache increment failed for {key}: {e}")
+        return None
+
+def cache_delete(*keys: str) -> None:
+    """Remove keys from the cache, ignoring Redis errors"""
+    try:
+        redis_client.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning(f"Cache delete failed for {keys}: {e}")
@@ -0,0 +1,55 @@
+import logging
+import os
+from pathlib import Path
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Longest-edge sizes of the resized copies generated for each profile image
+PROFILE_IMAGE_SIZES = (256, 512, 1024)
+
+def profile_image_variant_path(image_path: Path, size: int) -> Path:
+    """Location of the resized WebP copy of an uploaded profile image"""
+    return image_path.parent / "thumbs" / f"{image_path.stem}_{size}.webp"
+
+def strip_image_metadata(image_path: Path) -> None:
+    """
+    Re-encode an uploaded image in place without its EXIF metadata (including GPS
+    location), applying the EXIF orientation first. Raises if the file isn't a
+    readable image.
+    """
+    tmp_path = image_path.with_name(f".{image_path.name}.tmp")
+    try:
+        with Image.open(image_path) as original:
+            image_format = original.format
+            image = ImageOps.exif_transpose(original)
+            # Pillow only writes EXIF when it is passed explicitly
+            image.save(tmp_path, image_format, quality=90)
+        os.replace(tmp_path, image_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+def generate_profile_image_variants(image_path: Path) -> None:
+    """
+    Write resized WebP variants of a profile image whose metadata has already been
+    stripped. Meant to run after the response is sent, so failures are logged rather
+    than raised; the original is served until a variant exists.
+    """
+    try:
+        with Image.open(image_path) as image:
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+
+            for size in PROFILE_IMAGE_SIZES:
+                variant_path = profile_image_variant_path(image_path, size)
+                variant_path.parent.mkdir(exist_ok=True)
+                variant = image.copy()
+                variant.thumbnail((size, size))
+                variant.save(variant_path, "WEBP", quality=80)
+    except Exception as e:
+        logger.warning(f"Failed to generate variants for profile image {image_path}: {e}")
+
+def delete_profile_image_variants(image_path: Path) -> None:
+    """Remove the resized copies of a deleted profile image"""
+    for size in PROFILE_IMAGE_SIZES:
+        profile_image_variant_path(image_path, size).unlink(missing_ok=True)
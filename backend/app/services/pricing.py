@@ -1,8 +1,17 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import update
 from app.models.platform_fee import PlatformFeeConfig
 from app.models.user import User, UserRole
 from app.core.config import settings
-from typing import Tuple, Optional
+from app.services.cache import cache_get_or_set, cache_delete, bump_cache_generation
+from typing import Dict, List, Tuple, Optional
+
+# Fee configs only change through set_platform_fee, which drops the affected key
+PLATFORM_FEE_CACHE_TTL = 300
+
+def platform_fee_cache_key(provider_id: Optional[int] = None) -> str:
+    """Cache key for a provider's fee override, or the global fee when provider_id is None"""
+    return f"v1:platform_fee:{provider_id if provider_id else 'global'}"
 
 class PricingService:
     """Service to handle all pricing calculations and platform fee logic"""
@@ -14,23 +23,31 @@ class PricingService:
         Returns the fee as a decimal (e.g., 0.30 for 30%)
         """
         if provider_id:
-            # Check for provider-specific fee
-            provider_fee = db.query(PlatformFeeConfig).filter(
-                PlatformFeeConfig.provider_id == provider_id,
-                PlatformFeeConfig.is_active == True
-            ).first()
+            # Check for provider-specific fee; cached as {"fee": None} when there is no override
+            def load_provider_fee() -> dict:
+                provider_fee = db.query(PlatformFeeConfig.fee_percentage).filter(
+                    PlatformFeeConfig.provider_id == provider_id,
+                    PlatformFeeConfig.is_active == True
+                ).first()
+                return {"fee": provider_fee.fee_percentage if provider_fee else None}
             
-            if provider_fee:
-                return provider_fee.fee_percentage
+            provider_fee = cache_get_or_set(
+                platform_fee_cache_key(provider_id), PLATFORM_FEE_CACHE_TTL, load_provider_fee
+            )
+            if provider_fee["fee"] is not None:
+                return provider_fee["fee"]
         
         # Check for global fee configuration
-        global_fee = db.query(PlatformFeeConfig).filter(
-            PlatformFeeConfig.provider_id.is_(None),
-            PlatformFeeConfig.is_active == True
-        ).order_by(PlatformFeeConfig.created_at.desc()).first()
+        def load_global_fee() -> dict:
+            global_fee = db.query(PlatformFeeConfig.fee_percentage).filter(
+                PlatformFeeConfig.provider_id.is_(None),
+                PlatformFeeConfig.is_active == True
+            ).order_by(PlatformFeeConfig.created_at.desc()).first()
+            return {"fee": global_fee.fee_percentage if global_fee else None}
         
-        if global_fee:
-            return global_fee.fee_percentage
+        global_fee = cache_get_or_set(platform_fee_cache_key(), PLATFORM_FEE_CACHE_TTL, load_global_fee)
+        if global_fee["fee"] is not None:
+            return global_fee["fee"]
         
         # Fallback to default from settings
         return settings.PLATFORM_COMMISSION
@@ -46,6 +63,38 @@ class PricingService:
         - platform_fee_amount: The fee amount per hour (30 tokens)
         """
         platform_fee_percentage = PricingService.get_platform_fee_percentage(db, provider_id)
+        return PricingService.rates_for_fee(provider_hourly_rate, platform_fee_percentage)
+    
+    @staticmethod
+    def calculate_provider_rates_bulk(db: Session, provider_rates: List[Tuple[int, int]]) -> Dict[int, dict]:
+        """
+        Calculate rates for many providers at once, keyed by provider id.
+        provider_rates is a list of (provider_id, provider_hourly_rate) pairs. Fee
+        overrides for all providers are read in a single query.
+        """
+        provider_ids = [provider_id for provider_id, _ in provider_rates]
+        if not provider_ids:
+            return {}
+        
+        overrides = dict(db.query(PlatformFeeConfig.provider_id, PlatformFeeConfig.fee_percentage).filter(
+            PlatformFeeConfig.provider_id.in_(provider_ids),
+            PlatformFeeConfig.is_active == True
+        ).all())
+        
+        global_fee_percentage = None
+        if len(overrides) < len(set(provider_ids)):
+            global_fee_percentage = PricingService.get_platform_fee_percentage(db)
+        
+        return {
+            provider_id: PricingService.rates_for_fee(
+                provider_hourly_rate, overrides.get(provider_id, global_fee_percentage)
+            )
+            for provider_id, provider_hourly_rate in provider_rates
+        }
+    
+    @staticmethod
+    def rates_for_fee(provider_hourly_rate: int, platform_fee_percentage: float) -> dict:
+        """Build the rate breakdown returned by calculate_provider_rates for a known fee"""
         platform_fee_amount = int(provider_hourly_rate * platform_fee_percentage)
         seeker_rate = provider_hourly_rate + platform_fee_amount
         
@@ -108,19 +157,15 @@ class PricingService:
         Set platform fee (global or for specific provider)
         Only super admins can set fees directly
         """
-        # Deactivate existing fee config
-        existing_query = db.query(PlatformFeeConfig).filter(
-            PlatformFeeConfig.is_active == True
-        )
+        # Deactivate existing fee config in one UPDATE rather than loading it first
+        deactivate = update(PlatformFeeConfig).where(PlatformFeeConfig.is_active == True)
         
         if provider_id:
-            existing_query = existing_query.filter(PlatformFeeConfig.provider_id == provider_id)
+            deactivate = deactivate.where(PlatformFeeConfig.provider_id == provider_id)
         else:
-            existing_query = existing_query.filter(PlatformFeeConfig.provider_id.is_(None))
+            deactivate = deactivate.where(PlatformFeeConfig.provider_id.is_(None))
         
-        existing_config = existing_query.first()
-        if existing_config:
-            existing_config.is_active = False
+        db.execute(deactivate.values(is_active=False))
         
         # Create new fee config
         new_config = PlatformFeeConfig(
@@ -132,5 +177,9 @@ class PricingService:
         
         db.add(new_config)
         db.commit()
+        cache_delete(platform_fee_cache_key(provider_id))
+        # Search results and provider dashboard views embed seeker rates
+        bump_cache_generation("provider_search")
+        bump_cache_generation("platform_fee")
         
         return new_config
\ No newline at end of file
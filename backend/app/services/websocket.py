@@ -1,12 +1,37 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List, Optional, Set
-import json
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
 import logging
+import time
+import orjson
+import redis.asyncio as redis
 from datetime import datetime
 from enum import Enum
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Typing events repeated for the same chat within this window are dropped
+TYPING_INDICATOR_INTERVAL = 0.2  # seconds
+
+# Users whose presence hasn't been refreshed for this long count as offline. Clients
+# ping every 30 seconds, so this tolerates a couple of missed pings or a crashed worker
+PRESENCE_TTL = 90  # seconds
+ONLINE_USERS_KEY = "ws:online"
+BROADCAST_CHANNEL = "ws:broadcast"
+
+def user_channel(user_id: int) -> str:
+    """Pub/sub channel carrying messages for one user's connections on every worker"""
+    return f"ws:user:{user_id}"
+
+def role_channel(role: str) -> str:
+    """Pub/sub channel carrying messages for every connected user with a role"""
+    return f"ws:role:{role}"
+
+def encode_message(message: dict) -> str:
+    """Serialize a message for a text frame, which the browser client JSON.parses"""
+    return orjson.dumps(message).decode()
+
 class NotificationType(str, Enum):
     BOOKING_UPDATE = "booking_update"
     CHAT_MESSAGE = "chat_message"
@@ -15,18 +40,32 @@ class NotificationType(str, Enum):
     USER_STATUS = "user_status"
 
 class WebSocketManager:
+    """
+    Tracks this worker's connections. Messages are published to Redis and delivered
+    by whichever workers hold the recipient's connections, and presence is kept in a
+    Redis sorted set, so any number of workers can serve websockets.
+    """
     def __init__(self):
         # Store active connections: user_id -> set of websockets
         self.active_connections: Dict[int, Set[WebSocket]] = {}
         # Store user info for each websocket
         self.connection_info: Dict[WebSocket, dict] = {}
+        # When each (user_id, chat_id) last had a typing indicator forwarded
+        self.typing_sent_at: Dict[Tuple[int, Optional[int]], float] = {}
+        self.redis = redis.from_url(settings.REDIS_URL)
+        self.pubsub = self.redis.pubsub()
+        self.listener: Optional[asyncio.Task] = None
 
     async def connect(self, websocket: WebSocket, user_id: int, user_role: str):
         """Accept a new WebSocket connection"""
         await websocket.accept()
         
+        channels = []
         if user_id not in self.active_connections:
             self.active_connections[user_id] = set()
+            channels.append(user_channel(user_id))
+        if not self.has_role_connections(user_role):
+            channels.append(role_channel(user_role))
         
         self.active_connections[user_id].add(websocket)
         self.connection_info[websocket] = {
@@ -35,6 +74,9 @@ class WebSocketManager:
             "connected_at": datetime.utcnow()
         }
         
+        await self.subscribe(*channels)
+        await self.refresh_presence(user_id)
+        
         logger.info(f"WebSocket connected for user {user_id} ({user_role})")
         
         # Send initial connection confirmation
@@ -44,11 +86,12 @@ class WebSocketManager:
             "timestamp": datetime.utcnow().isoformat()
         })
 
-    def disconnect(self, websocket: WebSocket):
+    async def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection"""
         if websocket in self.connection_info:
             user_info = self.connection_info[websocket]
             user_id = user_info["user_id"]
+            channels = []
             
             # Remove websocket from user's connections
             if user_id in self.active_connections:
@@ -57,54 +100,156 @@ class WebSocketManager:
                 # Remove user entry if no more connections
                 if not self.active_connections[user_id]:
                     del self.active_connections[user_id]
+                    self.typing_sent_at = {
+                        key: sent_at for key, sent_at in self.typing_sent_at.items() if key[0] != user_id
+                    }
+                    channels.append(user_channel(user_id))
+                    # A connection on another worker re-adds the user on its next ping
+                    await self.remove_presence(user_id)
             
             # Remove connection info
             del self.connection_info[websocket]
             
+            if not self.has_role_connections(user_info["user_role"]):
+                channels.append(role_channel(user_info["user_role"]))
+            await self.unsubscribe(*channels)
+            
             logger.info(f"WebSocket disconnected for user {user_id}")
 
+    def has_role_connections(self, role: str) -> bool:
+        """Whether this worker holds any connection for a user with the role"""
+        return any(info["user_role"] == role for info in self.connection_info.values())
+
+    async def subscribe(self, *channels: str):
+        """Start receiving published messages for channels, starting the listener if needed"""
+        if not channels:
+            return
+        try:
+            await self.pubsub.subscribe(BROADCAST_CHANNEL, *channels)
+        except redis.RedisError as e:
+            logger.error(f"WebSocket subscribe failed for {channels}: {e}")
+            return
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.create_task(self.listen())
+
+    async def unsubscribe(self, *channels: str):
+        """Stop receiving published messages for channels"""
+        if not channels:
+            return
+        try:
+            await self.pubsub.unsubscribe(*channels)
+        except redis.RedisError as e:
+            logger.warning(f"WebSocket unsubscribe failed for {channels}: {e}")
+
+    async def listen(self):
+        """Deliver messages published by any worker to this worker's connections"""
+        try:
+            async for event in self.pubsub.listen():
+                if event["type"] != "message":
+                    continue
+                channel = event["channel"].decode()
+                payload = event["data"].decode()
+                if channel == BROADCAST_CHANNEL:
+                    await self.deliver(list(self.connection_info), payload)
+                elif channel.startswith("ws:user:"):
+                    user_id = int(channel.rsplit(":", 1)[1])
+                    await self.deliver(list(self.active_connections.get(user_id, ())), payload)
+                elif channel.startswith("ws:role:"):
+                    role = channel.rsplit(":", 1)[1]
+                    await self.deliver([
+                        websocket for websocket, info in list(self.connection_info.items())
+                        if info["user_role"] == role
+                    ], payload)
+        except Exception as e:
+            # The next connect restarts the listener
+            logger.error(f"WebSocket pub/sub listener stopped: {e}")
+
+    async def deliver(self, connections: List[WebSocket], payload: str):
+        """Send an encoded message to local connections, dropping any that fail"""
+        for websocket in connections:
+            try:
+                await websocket.send_text(payload)
+            except Exception as e:
+                logger.error(f"Error sending message to user {self.connection_info.get(websocket, {}).get('user_id')}: {e}")
+                # Remove failed connection
+                await self.disconnect(websocket)
+
+    async def publish(self, channel: str, message: dict, fallback: List[WebSocket]):
+        """Publish a message to every worker, delivering only locally if Redis is unavailable"""
+        payload = encode_message(message)
+        try:
+            await self.redis.publish(channel, payload)
+        except redis.RedisError as e:
+            logger.warning(f"WebSocket publish failed for {channel}, delivering locally: {e}")
+            await self.deliver(fallback, payload)
+
     async def send_personal_message(self, user_id: int, message: dict):
         """Send a message to a specific user (all their connections)"""
-        if user_id in self.active_connections:
-            connections = self.active_connections[user_id].copy()
-            
-            for websocket in connections:
-                try:
-                    await websocket.send_text(json.dumps(message))
-                except Exception as e:
-                    logger.error(f"Error sending message to user {user_id}: {e}")
-                    # Remove failed connection
-                    self.disconnect(websocket)
+        await self.publish(user_channel(user_id), message, list(self.active_connections.get(user_id, ())))
 
     async def send_to_role(self, role: str, message: dict):
         """Send a message to all users with a specific role"""
-        for user_id, connections in self.active_connections.items():
-            for websocket in connections.copy():
-                if websocket in self.connection_info:
-                    user_info = self.connection_info[websocket]
-                    if user_info["user_role"] == role:
-                        try:
-                            await websocket.send_text(json.dumps(message))
-                        except Exception as e:
-                            logger.error(f"Error sending message to {role} user {user_id}: {e}")
-                            self.disconnect(websocket)
+        await self.publish(role_channel(role), message, [
+            websocket for websocket, info in list(self.connection_info.items())
+            if info["user_role"] == role
+        ])
 
     async def broadcast(self, message: dict):
         """Send a message to all connected users"""
-        for user_id in list(self.active_connections.keys()):
-            await self.send_personal_message(user_id, message)
+        await self.publish(BROADCAST_CHANNEL, message, list(self.connection_info))
+
+    async def refresh_presence(self, user_id: int):
+        """Mark a user online until PRESENCE_TTL from now"""
+        now = time.time()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.zadd(ONLINE_USERS_KEY, {str(user_id): now + PRESENCE_TTL})
+                pipe.zremrangebyscore(ONLINE_USERS_KEY, "-inf", now)
+                await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Presence refresh failed for user {user_id}: {e}")
+
+    async def remove_presence(self, user_id: int):
+        """Mark a user offline"""
+        try:
+            await self.redis.zrem(ONLINE_USERS_KEY, str(user_id))
+        except redis.RedisError as e:
+            logger.warning(f"Presence removal failed for user {user_id}: {e}")
+
+    def should_send_typing(self, user_id: int, chat_id: Optional[int]) -> bool:
+        """Whether a typing event should be forwarded, collapsing bursts per user and chat"""
+        now = time.monotonic()
+        key = (user_id, chat_id)
+        if now - self.typing_sent_at.get(key, 0.0) < TYPING_INDICATOR_INTERVAL:
+            return False
+        self.typing_sent_at[key] = now
+        return True
 
-    def get_user_count(self) -> int:
-        """Get the number of connected users"""
-        return len(self.active_connections)
+    async def get_online_users(self) -> List[int]:
+        """Get list of all online user IDs across workers"""
+        try:
+            members = await self.redis.zrangebyscore(ONLINE_USERS_KEY, time.time(), "+inf")
+        except redis.RedisError as e:
+            logger.warning(f"Presence lookup failed, using local connections: {e}")
+            return list(self.active_connections.keys())
+        return [int(member) for member in members]
 
-    def is_user_online(self, user_id: int) -> bool:
-        """Check if a user is currently online"""
-        return user_id in self.active_connections and len(self.active_connections[user_id]) > 0
+    async def get_user_count(self) -> int:
+        """Get the number of connected users across workers"""
+        try:
+            return await self.redis.zcount(ONLINE_USERS_KEY, time.time(), "+inf")
+        except redis.RedisError as e:
+            logger.warning(f"Presence count failed, using local connections: {e}")
+            return len(self.active_connections)
 
-    def get_online_users(self) -> List[int]:
-        """Get list of all online user IDs"""
-        return list(self.active_connections.keys())
+    async def is_user_online(self, user_id: int) -> bool:
+        """Check if a user is currently online on any worker"""
+        try:
+            expires_at = await self.redis.zscore(ONLINE_USERS_KEY, str(user_id))
+        except redis.RedisError as e:
+            logger.warning(f"Presence lookup failed for user {user_id}, using local connections: {e}")
+            return bool(self.active_connections.get(user_id))
+        return expires_at is not None and expires_at > time.time()
 
     async def send_booking_notification(self, user_id: int, booking_data: dict):
         """Send booking-related notification"""
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Create (or refresh) the materialized view backing the admin dashboard statistics
+
+Run without arguments to create the view, and with --refresh from a scheduler
+(e.g. cron every few minutes) to keep it up to date.
+POST /admin/dashboard/cache/invalidate also refreshes it on demand.
+"""
+
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.database import engine
+from sqlalchemy import text
+
+# Enum columns are stored by member name, hence the upper-case literals
+CREATE_VIEW_SQL = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_admin_dashboard_stats AS
+SELECT
+    1 AS id,
+    u.total_users,
+    u.total_providers,
+    u.total_seekers,
+    (SELECT COUNT(*) FROM verifications WHERE status = 'PENDING') AS pending_verifications,
+    (SELECT COUNT(*) FROM bookings WHERE status IN ('PENDING', 'CONFIRMED', 'IN_PROGRESS')) AS active_bookings,
+    (SELECT COUNT(*) FROM disputes WHERE status IN ('OPEN', 'INVESTIGATING')) AS open_disputes,
+    (SELECT COUNT(*) FROM support_tickets WHERE status IN ('OPEN', 'IN_PROGRESS')) AS open_support_tickets,
+    (SELECT COALESCE(SUM(amount), 0) FROM token_transactions
+        WHERE type = 'PURCHASE' AND status = 'COMPLETED') AS purchased_tokens,
+    now() AS refreshed_at
+FROM (
+    SELECT
+        COUNT(*) AS total_users,
+        COUNT(*) FILTER (WHERE role = 'PROVIDER') AS total_providers,
+        COUNT(*) FILTER (WHERE role = 'SEEKER') AS total_seekers
+    FROM users
+) u;
+"""
+
+# A unique index is required for REFRESH ... CONCURRENTLY
+CREATE_INDEX_SQL = "CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_admin_dashboard_stats_id ON mv_admin_dashboard_stats (id);"
+
+def create_dashboard_stats_view():
+    """Create the mv_admin_dashboard_stats materialized view"""
+    print("🔧 Creating mv_admin_dashboard_stats materialized view...")
+    
+    with engine.begin() as conn:
+        try:
+            conn.execute(text(CREATE_VIEW_SQL))
+            conn.execute(text(CREATE_INDEX_SQL))
+            print('✅ mv_admin_dashboard_stats is ready')
+        except Exception as e:
+            print(f'❌ Error: {e}')
+            raise
+
+def refresh_dashboard_stats_view():
+    """Refresh mv_admin_dashboard_stats without blocking readers"""
+    with engine.begin() as conn:
+        conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_admin_dashboard_stats;"))
+    print('✅ Refreshed mv_admin_dashboard_stats')
+
+if __name__ == "__main__":
+    if "--refresh" in sys.argv:
+        refresh_dashboard_stats_view()
+    else:
+        create_dashboard_stats_view()
@@ -39,6 +39,22 @@ class TestAuthentication:
         assert data["email"] == user_data["email"]
         assert data["role"] == user_data["role"]
     
+    def test_register_query_count(self, client: TestClient, db_session, count_queries):
+        """Test registration stays within its query budget"""
+        user_data = {
+            "email": "query_count@test.com",
+            "password": "securepass123",
+            "role": "seeker",
+            "age_confirmed": True
+        }
+        
+        with count_queries() as queries:
+            response = client.post("/auth/register", json=user_data)
+        assert response.status_code == 200
+        
+        # User insert, wallet insert and the refresh after commit
+        assert len(queries) <= 3
+    
     def test_register_duplicate_email(self, client: TestClient, test_seeker):
         """Test registration with duplicate email"""
         user_data = {
@@ -0,0 +1,58 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.models.rating import Rating
+
+@pytest.fixture
+def test_rating(db_session, test_booking):
+    """Create a rating from the test seeker for the test provider"""
+    rating = Rating(
+        booking_id=test_booking.id,
+        rated_by=test_booking.seeker_id,
+        rated_user=test_booking.provider_id,
+        rating=5,
+        review="Great"
+    )
+    db_session.add(rating)
+    db_session.commit()
+    db_session.refresh(rating)
+    return rating
+
+class TestRatingLazyLoads:
+    """Rating list endpoints must not lazy-load relationships; raise_on_lazy_load turns any into an error"""
+    
+    def test_get_my_ratings_given(self, client: TestClient, test_rating, seeker_headers, raise_on_lazy_load):
+        response = client.get("/ratings/my-ratings", headers=seeker_headers)
+        assert response.status_code == 200
+        assert response.json()["ratings"][0]["other_user_name"] == "Test Provider"
+    
+    def test_get_my_ratings_received(self, client: TestClient, test_rating, provider_headers, raise_on_lazy_load):
+        response = client.get("/ratings/my-ratings?as_reviewer=false", headers=provider_headers)
+        assert response.status_code == 200
+        assert len(response.json()["ratings"]) == 1
+    
+    def test_get_provider_ratings(self, client: TestClient, test_rating, raise_on_lazy_load):
+        response = client.get(f"/ratings/provider/{test_rating.rated_user}")
+        assert response.status_code == 200
+        assert response.json()["total_ratings"] == 1
+
+class TestProfileRatingTotals:
+    """Provider rating totals are kept on the profile as ratings are written"""
+    
+    def test_create_rating_updates_provider_totals(self, client: TestClient, db_session, test_booking, test_provider, seeker_headers):
+        from app.models.booking import BookingStatus
+        from app.models.profile import Profile, ProfileVerificationStatus
+        
+        profile = db_session.query(Profile).filter(Profile.user_id == test_provider.id).first()
+        profile.verification_status = ProfileVerificationStatus.APPROVED
+        test_booking.status = BookingStatus.COMPLETED
+        db_session.commit()
+        
+        response = client.get(f"/providers/{profile.id}")
+        assert response.json()["total_ratings"] == 0
+        
+        response = client.post("/ratings/create", json={"booking_id": test_booking.id, "rating": 4}, headers=seeker_headers)
+        assert response.status_code == 200
+        
+        response = client.get(f"/providers/{profile.id}")
+        assert response.json()["total_ratings"] == 1
+        assert response.json()["avg_rating"] == 4.0
@@ -1,12 +1,13 @@
 import pytest
 import asyncio
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from httpx import AsyncClient
 
 from main import app
-from app.database.database import Base, get_db
+from app.database.database import Base, get_db, raise_on_lazy_load as add_raiseload
 from app.models.user import User, UserRole
 from app.models.booking import Booking, BookingStatus, BookingType
 from app.models.profile import Profile
@@ -54,6 +55,33 @@ def db_session():
         # Clean up after each test
         Base.metadata.drop_all(bind=engine)
 
+@pytest.fixture
+def count_queries():
+    """Collect SQL statements executed against the test database inside a with block"""
+    @contextmanager
+    def counter():
+        statements = []
+        
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    
+    return counter
+
+@pytest.fixture
+def raise_on_lazy_load():
+    """Make any lazy relationship load in the app's sessions raise instead of issuing a query"""
+    event.listen(TestingSessionLocal, "do_orm_execute", add_raiseload)
+    try:
+        yield
+    finally:
+        event.remove(TestingSessionLocal, "do_orm_execute", add_raiseload)
+
 @pytest.fixture
 def client():
     """Create test client"""
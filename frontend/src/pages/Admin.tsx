@@ -134,7 +134,7 @@ const Admin: React.FC = () => {
   const fetchEmployees = async () => {
     try {
       const response = await axios.get('/admin/employees');
-      setEmployees(response.data);
+      setEmployees(response.data.employees);
     } catch (error: any) {
       console.error('Error fetching employees:', error);
       toast.error('Failed to load employees');
@@ -154,7 +154,7 @@ const Admin: React.FC = () => {
   const fetchVerifications = async () => {
     try {
       const response = await axios.get('/admin/verification-queue');
-      setVerifications(response.data);
+      setVerifications(response.data.verifications);
     } catch (error: any) {
       console.error('Error fetching verifications:', error);
       toast.error('Failed to load verification queue');